@@ -1,15 +1,44 @@
-from typing import List
+from typing import List, Tuple
 import fnmatch
 from models import Permission, AccessLevel, ToolCall, AccessRequest, AccessResponse
 from data import USERS, PERSONA_PERMISSIONS
 from task_mapper import TaskMapper
+from model_registry import ModelRegistry
+
+# Agents retry the same prompts constantly; keep recent mapping results around
+MAPPING_CACHE_SIZE = 4096
+MAPPING_CACHE_TTL = 300.0
+# Access decisions only need the few best-matching tasks
+MAPPING_TOP_K = 3
+# Whole-prompt scoring by default: per-clause scoring maps more tasks per prompt,
+# which widens what a single request can be mapped to
+MAPPING_MULTI_INTENT = False
 
 class AccessController:
-    def __init__(self):
+    def __init__(self, multi_intent: bool = MAPPING_MULTI_INTENT):
+        """
+        Args:
+            multi_intent: Also score each clause of a multi-step prompt and map the
+                tasks of every clause, not just those of the prompt as a whole.
+                Off by default: a prompt can then be mapped to tasks that only one
+                of its clauses names
+        """
+        self.multi_intent = multi_intent
         self.users = {user.user_id: user for user in USERS}
-        self.task_mapper = TaskMapper()
+        # The live mapper can be rebuilt and swapped without a restart
+        self.model_registry = ModelRegistry(
+            lambda tasks, sample_prompts: TaskMapper(
+                cache_size=MAPPING_CACHE_SIZE, cache_ttl=MAPPING_CACHE_TTL,
+                tasks=tasks, sample_prompts=sample_prompts
+            )
+        )
         self.persona_permissions = PERSONA_PERMISSIONS
     
+    @property
+    def task_mapper(self) -> TaskMapper:
+        """The currently live task mapper"""
+        return self.model_registry.current
+    
     def evaluate_access_request(self, request: AccessRequest) -> AccessResponse:
         """
         Evaluate an access request based on user persona and mapped tasks
@@ -29,8 +58,13 @@ class AccessController:
                 reason="User not found"
             )
         
-        # Map prompt to tasks
-        mapped_task_results = self.task_mapper.map_prompt_to_tasks(request.prompt)
+        # Map prompt to tasks, scoring the user's own persona first and falling
+        # back to all tasks so cross-persona prompts are still detected
+        with self.model_registry.lease() as task_mapper:
+            mapped_task_results = task_mapper.map_prompt_to_tasks(
+                request.prompt, persona=user.persona, global_fallback=True, top_k=MAPPING_TOP_K,
+                multi_intent=self.multi_intent
+            )
         mapped_task_ids = [task_id for task_id, _ in mapped_task_results]
         
         if not mapped_task_ids:
@@ -150,10 +184,10 @@ class AccessController:
         
         return self.persona_permissions.get(user.persona, [])
     
-    def get_allowed_tasks_for_user(self, user_id: str) -> List[str]:
+    def get_allowed_tasks_for_user(self, user_id: str) -> Tuple[str, ...]:
         """Get all task IDs that a user is allowed to perform"""
         user = self.users.get(user_id)
         if not user:
-            return []
+            return ()
         
-        return [task.task_id for task in self.task_mapper.get_tasks_by_persona(user.persona)]
+        return self.task_mapper.catalog.task_ids_by_persona(user.persona)
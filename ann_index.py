@@ -0,0 +1,92 @@
+from typing import Dict, List
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbor index over TF-IDF rows
+    
+    Rows are projected to a few dense dimensions with truncated SVD and clustered
+    with k-means. A query probes the lists whose centroids are closest to it until
+    the candidate budget is filled; only those candidates are scored exactly.
+    All state is plain arrays so it can be persisted and memory-mapped.
+    """
+    
+    def __init__(self, components: np.ndarray, centroids: np.ndarray,
+                 list_rows: np.ndarray, list_offsets: np.ndarray):
+        """
+        Args:
+            components: (n_components, n_features) projection to the reduced space
+            centroids: (n_lists, n_components) L2-normalized list centroids
+            list_rows: Row ids grouped by list
+            list_offsets: Start of each list in list_rows, plus the total length
+        """
+        self.components = components
+        self.centroids = centroids
+        self.list_rows = list_rows
+        self.list_offsets = list_offsets
+    
+    @classmethod
+    def build(cls, vectors, n_components: int = 64, n_lists: int = None, random_state: int = 0) -> "IVFIndex":
+        """
+        Build an index over the rows of a sparse matrix
+        
+        Args:
+            vectors: (n_rows, n_features) L2-normalized rows
+            n_components: Reduced dimensionality
+            n_lists: Number of inverted lists (default: about sqrt(n_rows))
+            random_state: Seed for SVD and k-means
+        """
+        n_rows, n_features = vectors.shape
+        n_components = max(1, min(n_components, n_features - 1, n_rows - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+        reduced = normalize(svd.fit_transform(vectors))
+        
+        n_lists = min(n_lists or max(1, int(np.sqrt(n_rows))), n_rows)
+        kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=random_state).fit(reduced)
+        
+        order = np.argsort(kmeans.labels_, kind="stable")
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(kmeans.labels_, minlength=n_lists), out=list_offsets[1:])
+        
+        return cls(
+            components=svd.components_.astype(np.float32),
+            centroids=normalize(kmeans.cluster_centers_).astype(np.float32),
+            list_rows=order.astype(np.int64),
+            list_offsets=list_offsets
+        )
+    
+    def candidates(self, prompt_vectors, budget: int) -> List[np.ndarray]:
+        """
+        Candidate rows for each prompt, closest lists first, until the budget is reached
+        
+        Returns:
+            One sorted array of row ids per prompt
+        """
+        reduced = normalize(np.asarray(prompt_vectors @ self.components.T))
+        list_order = np.argsort(-(reduced @ self.centroids.T), axis=1)
+        list_sizes = np.diff(self.list_offsets)
+        
+        results = []
+        for lists in list_order:
+            # Probe lists until their cumulative size covers the budget
+            n_probe = int(np.searchsorted(np.cumsum(list_sizes[lists]), budget)) + 1
+            rows = [self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists[:n_probe]]
+            results.append(np.sort(np.concatenate(rows)))
+        return results
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """State for persistence"""
+        return {
+            "components": self.components,
+            "centroids": self.centroids,
+            "list_rows": self.list_rows,
+            "list_offsets": self.list_offsets
+        }
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "IVFIndex":
+        """Rebuild an index from persisted state"""
+        return cls(arrays["components"], arrays["centroids"], arrays["list_rows"], arrays["list_offsets"])
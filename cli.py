@@ -10,7 +10,7 @@ from typing import List
 from models import AccessRequest, ToolCall
 from access_controller import AccessController
 from mcp_connectors import MCPManager
-from data import USERS, TASKS
+from data import USERS
 
 class CLI:
     def __init__(self):
@@ -31,7 +31,7 @@ class CLI:
     def list_tasks(self):
         """List all tasks"""
         print("\n=== Tasks ===")
-        for task in TASKS:
+        for task in self.access_controller.task_mapper.catalog:
             print(f"ID: {task.task_id}")
             print(f"Type: {task.task_type}")
             print(f"Description: {task.description}")
@@ -66,8 +66,9 @@ class CLI:
         print(f"\n=== Mapping Prompt ===")
         print(f"Prompt: {prompt}")
         
-        mapped_tasks = self.access_controller.task_mapper.map_prompt_to_tasks(prompt)
-        keywords = self.access_controller.task_mapper.analyze_prompt_keywords(prompt)
+        analysis = self.access_controller.task_mapper.analyze(prompt)
+        mapped_tasks = analysis["mapped_tasks"]
+        keywords = analysis["keywords"]
         
         print(f"\n--- Mapped Tasks ---")
         if mapped_tasks:
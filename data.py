@@ -87,6 +87,34 @@ TASKS = [
     )
 ]
 
+# Keywords that indicate each task type in a prompt
+TASK_KEYWORDS = {
+    TaskType.FEATURE_DEVELOPMENT: [
+        'implement', 'develop', 'create', 'build', 'add', 'new feature',
+        'enhancement', 'functionality', 'code', 'application'
+    ],
+    TaskType.PRODUCTION_SUPPORT: [
+        'production', 'server down', 'error', 'bug', 'hotfix', 'debug',
+        'issue', 'problem', 'fix', 'logs', 'crash'
+    ],
+    TaskType.INCIDENT_RESOLUTION: [
+        'ticket', 'incident', 'troubleshoot', 'investigate', 'resolve',
+        'network', 'connectivity', 'outage', 'itsm'
+    ],
+    TaskType.INFRASTRUCTURE_MAINTENANCE: [
+        'maintenance', 'script', 'configuration', 'server', 'infrastructure',
+        'update', 'patch', 'system'
+    ],
+    TaskType.LEAD_GENERATION: [
+        'lead', 'prospect', 'research', 'campaign', 'outbound',
+        'client', 'customer', 'sales'
+    ],
+    TaskType.PROPOSAL_DEVELOPMENT: [
+        'proposal', 'collateral', 'presentation', 'meeting',
+        'client', 'pitch', 'document'
+    ]
+}
+
 # Sample Prompts for Training/Testing
 SAMPLE_PROMPTS = [
     {
@@ -131,6 +159,100 @@ SAMPLE_PROMPTS = [
     }
 ]
 
+# Held-out prompts for evaluating mapping accuracy (never used for training)
+EVALUATION_PROMPTS = [
+    {
+        "text": "Build a new search feature for the customer portal",
+        "expected_tasks": ["feat_dev_001"],
+        "persona": PersonaType.ENGINEERING
+    },
+    {
+        "text": "Implement the export to CSV functionality in our application code",
+        "expected_tasks": ["feat_dev_001"],
+        "persona": PersonaType.ENGINEERING
+    },
+    {
+        "text": "Create a new repository for the billing service",
+        "expected_tasks": ["feat_dev_001"],
+        "persona": PersonaType.ENGINEERING
+    },
+    {
+        "text": "Production is throwing errors after the last release, analyze the logs",
+        "expected_tasks": ["prod_support_001"],
+        "persona": PersonaType.ENGINEERING
+    },
+    {
+        "text": "Debug the crash in the checkout service and ship a hotfix",
+        "expected_tasks": ["prod_support_001"],
+        "persona": PersonaType.ENGINEERING
+    },
+    {
+        "text": "Users report 500 errors from the production API",
+        "expected_tasks": ["prod_support_001"],
+        "persona": PersonaType.ENGINEERING
+    },
+    {
+        "text": "Resolve the ITSM ticket about the VPN outage",
+        "expected_tasks": ["incident_res_001"],
+        "persona": PersonaType.IT
+    },
+    {
+        "text": "Troubleshoot the network connectivity problem on floor three",
+        "expected_tasks": ["incident_res_001"],
+        "persona": PersonaType.IT
+    },
+    {
+        "text": "Investigate the incident reported in ticket #5678",
+        "expected_tasks": ["incident_res_001"],
+        "persona": PersonaType.IT
+    },
+    {
+        "text": "Run the patch scripts on all infrastructure servers",
+        "expected_tasks": ["infra_maint_001"],
+        "persona": PersonaType.IT
+    },
+    {
+        "text": "Schedule system maintenance for the database hosts",
+        "expected_tasks": ["infra_maint_001"],
+        "persona": PersonaType.IT
+    },
+    {
+        "text": "Update the server configuration for the new load balancer",
+        "expected_tasks": ["infra_maint_001"],
+        "persona": PersonaType.IT
+    },
+    {
+        "text": "Find prospects for our outbound campaign in retail",
+        "expected_tasks": ["lead_gen_001"],
+        "persona": PersonaType.SALES
+    },
+    {
+        "text": "Research leads among fintech startups",
+        "expected_tasks": ["lead_gen_001"],
+        "persona": PersonaType.SALES
+    },
+    {
+        "text": "Plan an outbound email campaign targeting hospitals",
+        "expected_tasks": ["lead_gen_001"],
+        "persona": PersonaType.SALES
+    },
+    {
+        "text": "Draft a proposal for the Acme renewal",
+        "expected_tasks": ["proposal_dev_001"],
+        "persona": PersonaType.SALES
+    },
+    {
+        "text": "Update our sales collateral with the new pricing",
+        "expected_tasks": ["proposal_dev_001"],
+        "persona": PersonaType.SALES
+    },
+    {
+        "text": "Prepare the pitch deck and proposal for the client meeting",
+        "expected_tasks": ["proposal_dev_001"],
+        "persona": PersonaType.SALES
+    }
+]
+
 # Persona Permissions Matrix
 PERSONA_PERMISSIONS = {
     PersonaType.ENGINEERING: [
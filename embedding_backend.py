@@ -0,0 +1,235 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+
+# Small general-purpose sentence encoder (6 layers, 384 dimensions) that runs well on CPU
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+def _import_torch():
+    """Import torch and transformers only when the embedding backend is used"""
+    try:
+        import torch
+        import transformers
+    except ImportError as e:
+        raise ImportError(
+            "The embedding backend requires torch and transformers "
+            "(pip install -r requirements.txt)"
+        ) from e
+    return torch, transformers
+
+class SentenceEncoder:
+    """
+    CPU sentence encoder: transformer token states, mean-pooled and L2-normalized
+    
+    With quantize=True the model's linear layers are converted to int8 with dynamic
+    quantization, which cuts CPU latency and memory at a small cost in accuracy.
+    """
+    
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, quantize: bool = False,
+                 max_length: int = 128, num_threads: Optional[int] = None):
+        """
+        Args:
+            model_name: Hugging Face model name or local path
+            quantize: Apply int8 dynamic quantization to linear layers
+            max_length: Maximum tokens per prompt (longer prompts are truncated)
+            num_threads: Torch intra-op threads (None keeps the torch default)
+        """
+        torch, transformers = _import_torch()
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_length = max_length
+        self._torch = torch
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+        model = transformers.AutoModel.from_pretrained(model_name).eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.dimension = model.config.hidden_size
+    
+    def get_params(self) -> Dict:
+        """Configuration that determines the embedding space"""
+        return {"model": self.model_name, "quantize": self.quantize, "max_length": self.max_length}
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts
+        
+        Returns:
+            (len(texts), dim) float32 matrix of L2-normalized embeddings
+        """
+        torch = self._torch
+        inputs = self.tokenizer(
+            list(texts), padding=True, truncation=True, max_length=self.max_length, return_tensors="pt"
+        )
+        with torch.inference_mode():
+            token_states = self.model(**inputs).last_hidden_state
+        
+        # Average only real tokens, not padding
+        mask = inputs["attention_mask"].unsqueeze(-1).to(token_states.dtype)
+        pooled = (token_states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled.numpy().astype(np.float32)
+
+# Queued by close() to stop the worker
+_STOP = object()
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching queue in front of a batch encode function
+    
+    Concurrent callers submit single texts; a worker thread groups them into one
+    encoder call as soon as max_batch_size texts are waiting or the oldest has
+    waited max_wait_ms, whichever comes first.
+    """
+    
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Args:
+            encode_fn: Embeds a list of texts into a (n, dim) matrix
+            max_batch_size: Most texts encoded in one call
+            max_wait_ms: Longest a queued text waits for a batch to fill
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+        
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self.closed = False
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+    
+    def submit(self, text: str) -> Future:
+        """Queue one text; the future resolves to its embedding"""
+        if self.closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((text, future))
+        return future
+    
+    def close(self):
+        """Encode what is already queued, then stop the worker thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(_STOP)
+        self._worker.join()
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts through the queue, blocking until all are done"""
+        futures = [self.submit(text) for text in texts]
+        return np.vstack([future.result() for future in futures])
+    
+    def stats(self) -> Dict:
+        """Batch counters"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0
+        }
+    
+    def _run(self):
+        """Worker loop: collect a batch, encode it, resolve its futures"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            
+            # Fill the batch until it is full or the first item's wait budget is spent;
+            # texts already queued are always taken, even once the budget is gone
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.encode_fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+class EmbeddingVectorizer:
+    """
+    Vectorizer backend producing dense sentence embeddings
+    
+    Shares the interface of the TF-IDF vectorizers. Training rows are embedded in
+    large batches at fit time; prompts go through a MicroBatcher so concurrent
+    requests share encoder calls. There are no corpus statistics, so partial_fit
+    has nothing to update.
+    """
+    
+    def __init__(self, encoder: SentenceEncoder, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 dtype: type = np.float32):
+        """
+        Args:
+            encoder: Sentence encoder
+            max_batch_size: Most prompts per micro-batch
+            max_wait_ms: Longest a prompt waits for its micro-batch to fill
+            dtype: Floating point type of the output vectors
+        """
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.dtype = dtype
+        self.batcher = MicroBatcher(encoder.encode, max_batch_size, max_wait_ms)
+    
+    def get_params(self) -> Dict:
+        """Configuration that determines the embedding space"""
+        return {"backend": "embedding", **self.encoder.get_params(), "dtype": np.dtype(self.dtype).name}
+    
+    def fit_transform(self, documents: Iterable) -> np.ndarray:
+        """Embed training documents in full batches, bypassing the queue"""
+        texts = _texts(documents)
+        return np.vstack([
+            self.encoder.encode(texts[start:start + self.max_batch_size])
+            for start in range(0, len(texts), self.max_batch_size)
+        ]).astype(self.dtype, copy=False)
+    
+    def partial_fit(self, documents: Iterable) -> "EmbeddingVectorizer":
+        """Embeddings have no corpus statistics to update"""
+        return self
+    
+    def transform(self, documents: Iterable) -> np.ndarray:
+        """L2-normalized embeddings of documents, via the micro-batching queue"""
+        return self.batcher.encode(_texts(documents)).astype(self.dtype, copy=False)
+    
+    def restore(self, doc_freq: Optional[np.ndarray] = None, n_docs: int = 0, terms: Optional[List[str]] = None):
+        """Nothing to restore: the encoder is loaded from its model name"""
+    
+    def close(self):
+        """Stop the micro-batching worker and close the encoder's embedding cache, if any"""
+        self.batcher.close()
+        close_encoder = getattr(self.encoder, "close", None)
+        if close_encoder is not None:
+            close_encoder()
+
+def _texts(documents: Iterable) -> List[str]:
+    """Raw text of strings or PromptAnalysis objects"""
+    return [getattr(document, "text", document) for document in documents]
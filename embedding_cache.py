@@ -0,0 +1,286 @@
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+
+VECTORS_FILE = "vectors.f16"
+INDEX_FILE = "index.log"
+HEADER_FILE = "header.json"
+LOCK_FILE = "cache.lock"
+
+# Subdirectories tried when the cache directory is owned by another instance
+MAX_OWNERS = 64
+
+# Index log record: prompt hash, slot, CRC32 of (hash, slot, stored vector bytes)
+RECORD = struct.Struct("<16sII")
+
+# Rewrite the index log once it holds this many records per live entry
+LOG_COMPACTION_RATIO = 4
+
+def prompt_key(text: str) -> bytes:
+    """128-bit hash identifying a prompt's exact text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class EmbeddingCache:
+    """
+    Persistent prompt-embedding cache: a memory-mapped float16 matrix plus a hash index
+    
+    Embeddings live in fixed slots of one preallocated float16 file (max_entries rows).
+    The index is an append-only log of (prompt hash, slot, checksum) records: a vector
+    is written and flushed to its slot before its record is appended, and on load a
+    record only counts if its checksum matches the slot contents. A crash mid-write
+    therefore loses at most the entries being written, never returns a wrong vector.
+    When full, the least recently used entry's slot is reused.
+    
+    An instance owns its directory through an exclusive flock held until close():
+    the slot allocation lives in memory, so two instances writing one file would
+    hand out the same slots. If the directory is owned by another instance (another
+    worker process, or a mapper still live during a reload) the cache opens the
+    first free owner-N subdirectory instead. Every hit is also verified against its
+    record's checksum and served as a miss if the slot no longer matches.
+    """
+    
+    def __init__(self, directory: str, dim: int, max_entries: int = 100_000, config: Optional[Dict] = None):
+        """
+        Args:
+            directory: Cache directory (created if missing)
+            dim: Embedding dimensionality
+            max_entries: Size cap in embeddings (disk use is max_entries * dim * 2 bytes)
+            config: Encoder configuration; a cache written under a different one is discarded
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        
+        self.directory, self._lock_file = self._acquire(directory)
+        self.dim = dim
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.corrupted = 0
+        self._entries = OrderedDict()
+        self._checksums = {}
+        self._slot_keys = {}
+        self._log_records = 0
+        self._lock = threading.Lock()
+        
+        header = {"dim": dim, "max_entries": max_entries, "config": config}
+        vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        if self._read_header() == header and os.path.exists(vectors_path):
+            self._vectors = np.memmap(vectors_path, dtype=np.float16, mode="r+", shape=(max_entries, dim))
+            self._replay_log()
+        else:
+            # New cache, or one written for another encoder or shape: start empty
+            self._vectors = np.memmap(vectors_path, dtype=np.float16, mode="w+", shape=(max_entries, dim))
+            self._rewrite_log()
+            self._write_header(header)
+        self._free_slots = [slot for slot in range(max_entries - 1, -1, -1) if slot not in self._slot_keys]
+        self._log = open(os.path.join(self.directory, INDEX_FILE), "ab")
+    
+    @staticmethod
+    def _acquire(directory: str):
+        """Lock the cache directory, or the first unowned owner-N subdirectory, for this instance"""
+        candidates = [directory] + [os.path.join(directory, f"owner-{i}") for i in range(1, MAX_OWNERS + 1)]
+        for candidate in candidates:
+            os.makedirs(candidate, exist_ok=True)
+            lock_file = open(os.path.join(candidate, LOCK_FILE), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            return candidate, lock_file
+        raise RuntimeError(f"Embedding cache {directory} is owned by {MAX_OWNERS + 1} instances")
+    
+    def _read_header(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.directory, HEADER_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_header(self, header: Dict):
+        tmp_path = os.path.join(self.directory, HEADER_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(header, f)
+        os.replace(tmp_path, os.path.join(self.directory, HEADER_FILE))
+    
+    def _checksum(self, key: bytes, slot: int) -> int:
+        return zlib.crc32(key + struct.pack("<I", slot) + self._vectors[slot].tobytes())
+    
+    def _replay_log(self):
+        """Rebuild the hash index from the log, skipping torn or stale records"""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "rb") as f:
+                log = f.read()
+        except OSError:
+            log = b""
+        
+        # Drop a partially written trailing record so new appends stay aligned
+        usable = len(log) - len(log) % RECORD.size
+        if usable < len(log):
+            os.truncate(os.path.join(self.directory, INDEX_FILE), usable)
+        for key, slot, crc in RECORD.iter_unpack(log[:usable]):
+            if slot >= self.max_entries:
+                continue
+            # A later record for the same slot means the slot was reused
+            previous = self._slot_keys.get(slot)
+            if previous is not None:
+                del self._entries[previous]
+            self._entries.pop(key, None)
+            self._entries[key] = slot
+            self._slot_keys[slot] = key
+            self._checksums[key] = crc
+        
+        # Records whose vector write never completed fail the checksum
+        for key, slot in list(self._entries.items()):
+            if self._checksum(key, slot) != self._checksums[key]:
+                del self._entries[key]
+                del self._slot_keys[slot]
+        self._checksums = {key: self._checksums[key] for key in self._entries}
+        self._log_records = usable // RECORD.size
+    
+    def _rewrite_log(self):
+        """Atomically replace the log with one record per live entry"""
+        tmp_path = os.path.join(self.directory, INDEX_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            for key, slot in self._entries.items():
+                f.write(RECORD.pack(key, slot, self._checksums[key]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+        self._log_records = len(self._entries)
+    
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Cached float32 embeddings (None for misses); hits become most recently used"""
+        results = []
+        with self._lock:
+            for key in keys:
+                slot = self._entries.get(key)
+                if slot is not None and self._checksum(key, slot) != self._checksums[key]:
+                    # The slot no longer holds this prompt's vector: drop the entry, never serve it
+                    del self._entries[key]
+                    del self._checksums[key]
+                    del self._slot_keys[slot]
+                    self._free_slots.append(slot)
+                    self.corrupted += 1
+                    slot = None
+                if slot is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(np.asarray(self._vectors[slot], dtype=np.float32))
+        return results
+    
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        """Store embeddings, evicting least recently used entries when full"""
+        with self._lock:
+            records = []
+            for key, vector in zip(keys, vectors):
+                if key in self._entries:
+                    continue
+                if self._free_slots:
+                    slot = self._free_slots.pop()
+                else:
+                    evicted, slot = self._entries.popitem(last=False)
+                    del self._checksums[evicted]
+                    self.evictions += 1
+                self._vectors[slot] = vector
+                self._entries[key] = slot
+                self._slot_keys[slot] = key
+                self._checksums[key] = self._checksum(key, slot)
+                records.append((key, slot))
+            
+            if not records:
+                return
+            
+            # Vectors reach disk before the records that vouch for them
+            self._vectors.flush()
+            self._log.write(b"".join(RECORD.pack(key, slot, self._checksums[key]) for key, slot in records))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log_records += len(records)
+            
+            if self._log_records > LOG_COMPACTION_RATIO * self.max_entries:
+                self._log.close()
+                self._rewrite_log()
+                self._log = open(os.path.join(self.directory, INDEX_FILE), "ab")
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "corrupted": self.corrupted,
+                "directory": self.directory
+            }
+    
+    def close(self):
+        """Flush and close the cache files and give up the directory"""
+        with self._lock:
+            if self._log.closed:
+                return
+            self._vectors.flush()
+            self._log.close()
+            self._lock_file.close()
+
+class CachedEncoder:
+    """
+    Sentence encoder wrapper that serves repeated prompts from an EmbeddingCache
+    
+    Only cache misses reach the wrapped encoder, as a single batch.
+    """
+    
+    def __init__(self, encoder, cache: EmbeddingCache):
+        """
+        Args:
+            encoder: Object with encode(texts) -> (n, dim) array and get_params()
+            cache: Embedding cache for the encoder's configuration
+        """
+        self.encoder = encoder
+        self.cache = cache
+    
+    def get_params(self) -> Dict:
+        """Caching does not change the embedding space"""
+        return self.encoder.get_params()
+    
+    def close(self):
+        """Close the cache"""
+        self.cache.close()
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, encoding only those not already cached"""
+        keys = [prompt_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        
+        # Encode each distinct missing prompt once, even if the batch repeats it
+        misses = {}
+        for i, vector in enumerate(cached):
+            if vector is None:
+                misses.setdefault(keys[i], []).append(i)
+        if misses:
+            first = [positions[0] for positions in misses.values()]
+            encoded = np.asarray(self.encoder.encode([texts[i] for i in first]), dtype=np.float32)
+            self.cache.put_many(list(misses), encoded)
+            for positions, vector in zip(misses.values(), encoded):
+                for i in positions:
+                    cached[i] = vector
+        
+        # float16 storage perturbs norms slightly; renormalize for exact cosine scores
+        embeddings = np.vstack(cached)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
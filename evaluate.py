@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency evaluation for the task mapping model
+"""
+
+import argparse
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from task_mapper import TaskMapper, BACKENDS
+from data import TASKS, SAMPLE_PROMPTS, EVALUATION_PROMPTS
+from prompt_analysis import tokenize
+from token_normalizer import NORMALIZERS
+from sharded_scorer import default_shards
+
+LABELED_SETS = {
+    "training": SAMPLE_PROMPTS,
+    "held-out": EVALUATION_PROMPTS
+}
+
+def measure_accuracy(mapper: TaskMapper, prompts: List[Dict], threshold: float) -> Dict[str, float]:
+    """
+    Score a mapper against labeled prompts
+    
+    Returns:
+        top1: Share of prompts whose best task is an expected task
+        recall: Share of expected tasks returned above the threshold
+    """
+    results = mapper.map_prompts_to_tasks([p["text"] for p in prompts], threshold)
+    
+    top1_hits = 0
+    expected_total = 0
+    expected_found = 0
+    for prompt_data, mapped in zip(prompts, results):
+        mapped_ids = [task_id for task_id, _ in mapped]
+        if mapped_ids and mapped_ids[0] in prompt_data["expected_tasks"]:
+            top1_hits += 1
+        expected_total += len(prompt_data["expected_tasks"])
+        expected_found += len(set(prompt_data["expected_tasks"]) & set(mapped_ids))
+    
+    return {
+        "top1": top1_hits / len(prompts),
+        "recall": expected_found / expected_total
+    }
+
+def measure_latency(mapper: TaskMapper, texts: List[str], threshold: float, repeat: int) -> Dict[str, float]:
+    """
+    Time single-prompt and batched mapping
+    
+    Returns:
+        p50_us / p99_us: Single-call latency percentiles in microseconds
+        batch_us: Amortized per-prompt cost of one batched call in microseconds
+    """
+    samples = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            mapper.map_prompt_to_tasks(text, threshold)
+            samples.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        mapper.map_prompts_to_tasks(texts, threshold)
+    batch_elapsed = time.perf_counter() - start
+    
+    return {
+        "p50_us": float(np.percentile(samples, 50)) * 1e6,
+        "p99_us": float(np.percentile(samples, 99)) * 1e6,
+        "batch_us": batch_elapsed / (repeat * len(texts)) * 1e6
+    }
+
+def build_mapper(options: Dict) -> Tuple[TaskMapper, float]:
+    """Fit a mapper from scratch (no persisted artifact) and time it in milliseconds"""
+    start = time.perf_counter()
+    # The queries include the sample prompts the exact-match table is seeded with;
+    # keep it off so reports time scoring rather than table lookups
+    mapper = TaskMapper(artifact_dir=None, **{"fast_path_size": 0, **options})
+    return mapper, (time.perf_counter() - start) * 1e3
+
+def print_report(name: str, mapper: TaskMapper, build_ms: float, threshold: float, repeat: int):
+    """Print accuracy and latency of one mapper configuration"""
+    texts = [p["text"] for prompts in LABELED_SETS.values() for p in prompts]
+    latency = measure_latency(mapper, texts, threshold, repeat)
+    
+    print(f"\n--- {name} ---")
+    print(f"Rows scored: {mapper.task_vectors.shape[0]} (build {build_ms:.1f} ms)")
+    for set_name, prompts in LABELED_SETS.items():
+        accuracy = measure_accuracy(mapper, prompts, threshold)
+        print(f"{set_name}: top-1 {accuracy['top1']:.3f}, recall {accuracy['recall']:.3f}")
+    print(f"Latency: p50 {latency['p50_us']:.1f} us, p99 {latency['p99_us']:.1f} us, "
+          f"batched {latency['batch_us']:.1f} us/prompt")
+
+def evaluate_modes(args):
+    """Compare exhaustive scoring against centroid compression"""
+    print(f"\n=== Scoring Modes ({args.backend} backend, threshold {args.threshold}) ===")
+    
+    configurations = [("exhaustive", {"scoring_mode": "exhaustive", "backend": args.backend})]
+    for k in args.centroids:
+        configurations.append((
+            f"centroid k={k}",
+            {"scoring_mode": "centroid", "centroids_per_task": k, "backend": args.backend}
+        ))
+    
+    for name, options in configurations:
+        mapper, build_ms = build_mapper(options)
+        print_report(name, mapper, build_ms, args.threshold, args.repeat)
+
+def evaluate_cascade(args):
+    """Compare the first stage alone, the second stage alone and the cascade"""
+    print(f"\n=== Cascade (tfidf -> {args.second_stage}, margin {args.margin}, "
+          f"min score {args.min_score}) ===")
+    
+    configurations = [
+        ("tfidf", {}),
+        (args.second_stage, {"backend": args.second_stage}),
+        ("cascade", {
+            "cascade_backend": args.second_stage,
+            "cascade_margin": args.margin,
+            "cascade_min_score": args.min_score
+        })
+    ]
+    for name, options in configurations:
+        mapper, build_ms = build_mapper(options)
+        print_report(name, mapper, build_ms, args.threshold, args.repeat)
+    
+    stats = mapper.cascade_stats()
+    for stage in ("first_stage", "second_stage"):
+        print(f"{stage}: {stats[stage]['prompts']} prompts, hit rate {stats[stage]['hit_rate']:.3f}, "
+              f"{stats[stage]['mean_prompt_ms']:.3f} ms/prompt")
+
+def synthetic_examples(count: int, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """
+    Labeled prompts sampled from each task's description and sample prompt words
+    
+    Returns:
+        Texts and their task ids
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = {task.task_id: tokenize(task.description) for task in TASKS}
+    for prompt_data in SAMPLE_PROMPTS:
+        for task_id in prompt_data["expected_tasks"]:
+            vocabulary[task_id].extend(tokenize(prompt_data["text"]))
+    
+    task_ids = list(vocabulary)
+    texts, labels = [], []
+    for _ in range(count):
+        task_id = task_ids[rng.integers(len(task_ids))]
+        words = rng.choice(vocabulary[task_id], size=rng.integers(4, 10))
+        texts.append(" ".join(words))
+        labels.append(task_id)
+    return texts, labels
+
+def build_enlarged_mapper(options: Dict, texts: List[str], labels: List[str]) -> TaskMapper:
+    """Fit a mapper and fold labeled prompts into its fitted rows before returning"""
+    # add_examples would compact in the background; refit here so timings see the final model
+    mapper, _ = build_mapper({"compact_every": len(texts) + 1, **options})
+    mapper.add_examples(texts, labels)
+    mapper.compact()
+    return mapper
+
+def evaluate_ann(args):
+    """Measure ANN candidate scoring against exact scoring on an enlarged corpus"""
+    texts, labels = synthetic_examples(args.synthetic)
+    queries = [p["text"] for prompts in LABELED_SETS.values() for p in prompts]
+    
+    exact = build_enlarged_mapper({}, texts, labels)
+    # Reference answers: the exact top-k tasks with any similarity at all
+    exact_results = [
+        [task_id for task_id, score in mapped if score > 0]
+        for mapped in exact.map_prompts_to_tasks(queries, 0.0, top_k=args.top_k)
+    ]
+    
+    print(f"\n=== ANN Index ({exact.task_vectors.shape[0]} rows, top-{args.top_k}) ===")
+    print_latency("exact", measure_latency(exact, queries, args.threshold, args.repeat))
+    
+    for budget in args.candidates:
+        mapper = build_enlarged_mapper({"ann_candidates": budget}, texts, labels)
+        results = mapper.map_prompts_to_tasks(queries, 0.0, top_k=args.top_k)
+        
+        found = sum(
+            len(set(expected) & {task_id for task_id, _ in approximate})
+            for expected, approximate in zip(exact_results, results)
+        )
+        top1 = sum(
+            bool(expected) and bool(approximate) and expected[0] == approximate[0][0]
+            for expected, approximate in zip(exact_results, results)
+        )
+        total = sum(len(expected) for expected in exact_results)
+        
+        print(f"\nbudget {budget}: recall@{args.top_k} {found / total:.3f}, "
+              f"top-1 agreement {top1 / len(queries):.3f}")
+        print_latency("ann", measure_latency(mapper, queries, args.threshold, args.repeat))
+
+def evaluate_shards(args):
+    """Measure batched throughput of sharded multi-process scoring on an enlarged corpus"""
+    texts, labels = synthetic_examples(args.synthetic)
+    queries = [p["text"] for prompts in LABELED_SETS.values() for p in prompts]
+    batch = (queries * (args.batch // len(queries) + 1))[:args.batch]
+    
+    reference = None
+    for shards in [1] + [count for count in args.shards if count > 1]:
+        mapper = build_enlarged_mapper({"shards": shards}, texts, labels)
+        # Warm up (spawns and attaches the workers) and keep the results for comparison
+        results = mapper.map_prompts_to_tasks(batch, args.threshold)
+        if reference is None:
+            reference = results
+            print(f"\n=== Sharded Scoring ({mapper.task_vectors.shape[0]} rows, batch {len(batch)}) ===")
+        
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            mapper.map_prompts_to_tasks(batch, args.threshold)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        
+        mismatches = sum(
+            [task_id for task_id, _ in mapped] != [task_id for task_id, _ in expected]
+            for mapped, expected in zip(results, reference)
+        )
+        difference = max(
+            (abs(score - expected_score)
+             for mapped, expected in zip(results, reference)
+             for (_, score), (_, expected_score) in zip(mapped, expected)),
+            default=0.0
+        )
+        print(f"{shards} shard(s): {len(batch) / elapsed:.0f} prompts/s, "
+              f"{mismatches} differing results, max score difference {difference:.2e}")
+        mapper.close()
+
+def evaluate_normalization(args):
+    """Compare accuracy, vocabulary size and throughput with and without token normalization"""
+    print("\n=== Token Normalization ===")
+    for method in [None] + args.methods:
+        name = method or "none"
+        try:
+            mapper, build_ms = build_mapper({"token_normalizer": method})
+        except (ImportError, LookupError) as e:
+            print(f"\n--- {name} ---\nSkipped: {e}")
+            continue
+        
+        print_report(name, mapper, build_ms, args.threshold, args.repeat)
+        print(f"Vocabulary: {len(mapper.vectorizer.vocabulary_)} features")
+        normalizer = mapper.prompt_analyzer.normalizer
+        if normalizer is not None:
+            memo = normalizer.stats()
+            print(f"Memo: {memo['size']} tokens, hit rate {memo['hit_rate']:.3f}")
+
+def evaluate_features(args):
+    """Report model size and accuracy at each vocabulary pruning setting"""
+    print(f"\n=== Feature Budgets (threshold {args.threshold}) ===")
+    
+    configurations = [("full vocabulary", {})]
+    configurations += [(f"max_features={budget}", {"max_features": budget}) for budget in args.budgets]
+    configurations += [(f"chi2_features={budget}", {"chi2_features": budget}) for budget in args.budgets]
+    configurations += [(f"min_df={min_df}", {"min_df": min_df}) for min_df in args.min_df]
+    
+    print(f"{'configuration':<20} {'features':>8} {'nnz':>8} {'vocab bytes':>12} {'model bytes':>12}"
+          + "".join(f" {name + ' top-1':>14} {name + ' recall':>15}" for name in LABELED_SETS))
+    for name, options in configurations:
+        try:
+            mapper, _ = build_mapper(options)
+        except ValueError as e:
+            print(f"{name:<20} skipped: {e}")
+            continue
+        memory = mapper.memory_report()
+        accuracy = [measure_accuracy(mapper, prompts, args.threshold) for prompts in LABELED_SETS.values()]
+        print(f"{name:<20} {len(mapper.vectorizer.vocabulary_):>8} {mapper.task_vectors.nnz:>8} "
+              f"{memory['vocabulary']:>12} {memory['total']:>12}"
+              + "".join(f" {result['top1']:>14.3f} {result['recall']:>15.3f}" for result in accuracy))
+
+def print_latency(name: str, latency: Dict[str, float]):
+    """Print one latency measurement"""
+    print(f"{name} latency: p50 {latency['p50_us']:.1f} us, p99 {latency['p99_us']:.1f} us, "
+          f"batched {latency['batch_us']:.1f} us/prompt")
+
+def main():
+    parser = argparse.ArgumentParser(description="Task mapping evaluation")
+    subparsers = parser.add_subparsers(dest="command", help="Available evaluations")
+    
+    # Scoring modes command
+    modes_parser = subparsers.add_parser("modes", help="Compare exhaustive and centroid scoring")
+    modes_parser.add_argument("--threshold", type=float, default=0.3, help="Mapping threshold")
+    modes_parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    modes_parser.add_argument("--centroids", type=int, nargs="+", default=[1, 2],
+                              help="Centroids per task to evaluate")
+    modes_parser.add_argument("--backend", choices=BACKENDS, default="tfidf", help="Vectorizer backend")
+    
+    # Cascade command
+    cascade_parser = subparsers.add_parser("cascade", help="Evaluate the two-stage cascade")
+    cascade_parser.add_argument("--threshold", type=float, default=0.3, help="Mapping threshold")
+    cascade_parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    cascade_parser.add_argument("--second-stage", choices=BACKENDS, default="embedding",
+                                help="Backend of the second stage")
+    cascade_parser.add_argument("--margin", type=float, default=0.1, help="Top-1/top-2 margin gate")
+    cascade_parser.add_argument("--min-score", type=float, default=0.3, help="Top-1 score gate")
+    
+    # ANN index command
+    ann_parser = subparsers.add_parser("ann", help="Compare ANN candidate scoring with exact scoring")
+    ann_parser.add_argument("--threshold", type=float, default=0.3, help="Mapping threshold")
+    ann_parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    ann_parser.add_argument("--candidates", type=int, nargs="+", default=[200, 1000],
+                            help="Candidate budgets to evaluate")
+    ann_parser.add_argument("--synthetic", type=int, default=20000,
+                            help="Synthetic labeled prompts added to the corpus")
+    ann_parser.add_argument("--top-k", type=int, default=3, help="Tasks compared per prompt")
+    
+    # Sharded scoring command
+    shards_parser = subparsers.add_parser("shards", help="Measure sharded multi-process scoring throughput")
+    shards_parser.add_argument("--threshold", type=float, default=0.3, help="Mapping threshold")
+    shards_parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    shards_parser.add_argument("--shards", type=int, nargs="+", default=[default_shards()],
+                               help="Shard counts to evaluate, compared with in-process scoring "
+                                    "(default: one per available CPU)")
+    shards_parser.add_argument("--synthetic", type=int, default=20000,
+                               help="Synthetic labeled prompts added to the corpus")
+    shards_parser.add_argument("--batch", type=int, default=1024, help="Prompts per scored batch")
+    
+    # Token normalization command
+    normalize_parser = subparsers.add_parser("normalize", help="Benchmark NLTK stemming and lemmatization")
+    normalize_parser.add_argument("--threshold", type=float, default=0.3, help="Mapping threshold")
+    normalize_parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    normalize_parser.add_argument("--methods", choices=NORMALIZERS, nargs="+", default=list(NORMALIZERS),
+                                  help="Normalizers compared with unnormalized tokens")
+    
+    # Feature budget command
+    features_parser = subparsers.add_parser("features", help="Report size and accuracy at each feature budget")
+    features_parser.add_argument("--threshold", type=float, default=0.3, help="Mapping threshold")
+    features_parser.add_argument("--budgets", type=int, nargs="+", default=[100, 50, 25],
+                                 help="Feature budgets for max_features and chi2_features")
+    features_parser.add_argument("--min-df", type=int, nargs="+", default=[2],
+                                 help="Minimum document frequencies to evaluate")
+    
+    args = parser.parse_args()
+    
+    if not args.command:
+        parser.print_help()
+        return
+    
+    if args.command == "modes":
+        evaluate_modes(args)
+    elif args.command == "cascade":
+        evaluate_cascade(args)
+    elif args.command == "ann":
+        evaluate_ann(args)
+    elif args.command == "shards":
+        evaluate_shards(args)
+    elif args.command == "normalize":
+        evaluate_normalization(args)
+    elif args.command == "features":
+        evaluate_features(args)
+
+if __name__ == "__main__":
+    main()
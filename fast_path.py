@@ -0,0 +1,171 @@
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from prompt_budget import TermSketch
+from prompt_cache import WHITESPACE_PATTERN
+
+def canonical_prompt(prompt: str) -> str:
+    """
+    Canonical form of a prompt for exact matching
+    
+    Only lowercases and collapses whitespace, which never changes the prompt's
+    tokens, so a table row is exactly the score the prompt itself would get
+    (unlike normalize_prompt, whose ticket placeholder does change them).
+    """
+    return WHITESPACE_PATTERN.sub(" ", prompt.lower()).strip()
+
+class FastPathTable:
+    """
+    Exact-match table from canonical prompt text to precomputed per-task scores
+    
+    Templated prompts from automation repeat verbatim; a table hit returns the
+    stored score row without vectorizing or scoring anything. Rows hold the global
+    per-task scores, so one entry serves every persona, threshold and top_k.
+    
+    Each row is tagged with the model generation it was scored under. A model
+    update only bumps the generation (invalidate), which is O(1): stale rows read
+    as misses and are re-scored lazily, when the owner scores them anyway or when
+    they come up for promotion again.
+    
+    The table is seeded with known prompts (the labeled samples) and grows by
+    promotion: misses are counted in a bounded heavy-hitter sketch, and every
+    promote_every misses the hottest prompts seen at least min_count times are
+    handed back to the owner to be scored and inserted. A round hands back at most
+    max_promotions prompts, since the owner scores them inside a request; hot
+    prompts left over are handed back in later rounds.
+    """
+    
+    def __init__(self, max_size: int = 10_000, min_count: int = 3, promote_every: int = 256,
+                 max_promotions: int = 64):
+        """
+        Args:
+            max_size: Most prompts held in the table
+            min_count: Misses before a prompt is eligible for promotion
+            promote_every: Misses between promotion rounds
+            max_promotions: Most prompts promoted per round
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_count < 1 or promote_every < 1 or max_promotions < 1:
+            raise ValueError("min_count, promote_every and max_promotions must be at least 1")
+        
+        self.max_size = max_size
+        self.min_count = min_count
+        self.promote_every = promote_every
+        self.max_promotions = max_promotions
+        # canonical prompt -> (generation, row). Lookups read the dict without locking;
+        # writers replace entries atomically
+        self._rows = {}
+        self._seeded = set()
+        self._sketch = TermSketch(max_size)
+        self._since_promotion = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.promotions = 0
+    
+    @property
+    def generation(self) -> int:
+        """Current model generation; rows scored under older ones are stale"""
+        return self._generation
+    
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Stored score row of a canonical prompt, or None (also for stale rows)"""
+        entry = self._rows.get(key)
+        if entry is None or entry[0] != self._generation:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+    
+    def record_misses(self, keys: List[str]) -> List[str]:
+        """
+        Count prompts that missed the table
+        
+        Returns:
+            Prompts due for promotion (or for re-scoring, if their row is stale),
+            hottest first and at most max_promotions (empty between promotion
+            rounds); exactly one caller receives each round
+        """
+        with self._lock:
+            self._sketch.add(keys)
+            self._since_promotion += len(keys)
+            if self._since_promotion < self.promote_every:
+                return []
+            self._since_promotion = 0
+            hot = []
+            for key, count in self._sketch.counts.most_common():
+                if count < self.min_count or len(hot) >= self.max_promotions:
+                    break
+                entry = self._rows.get(key)
+                if entry is None or entry[0] != self._generation:
+                    hot.append(key)
+            return hot
+    
+    def seed(self, keys: List[str], rows: np.ndarray, generation: int):
+        """Insert known prompts; seeded entries are never evicted"""
+        self._insert(keys, rows, generation, seeded=True)
+    
+    def promote(self, keys: List[str], rows: np.ndarray, generation: int):
+        """Insert hot prompts, evicting colder promoted entries when the table is full"""
+        self._insert(keys, rows, generation, seeded=False)
+    
+    def refresh(self, keys: List[str], rows: np.ndarray, generation: int):
+        """Replace stale rows of prompts already in the table; other keys are ignored"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            for key, row in zip(keys, rows):
+                entry = self._rows.get(key)
+                # Replacing the value of an existing key never resizes the dict
+                if entry is not None and entry[0] != generation:
+                    self._rows[key] = (generation, row)
+    
+    def _insert(self, keys: List[str], rows: np.ndarray, generation: int, seeded: bool):
+        with self._lock:
+            if generation != self._generation:
+                return
+            rows_by_key = dict(self._rows)
+            counts = self._sketch.counts
+            # Keys are ordered hottest first, so stale and then colder promoted entries go first
+            evictable = sorted(
+                (key for key in rows_by_key if key not in self._seeded),
+                key=lambda key: (rows_by_key[key][0] == generation, counts.get(key, 0))
+            )
+            for key, row in zip(keys, rows):
+                new = key not in rows_by_key
+                if new and len(rows_by_key) >= self.max_size:
+                    if seeded or not evictable:
+                        continue
+                    coldest = evictable[0]
+                    if rows_by_key[coldest][0] == generation and counts.get(coldest, 0) >= counts.get(key, 0):
+                        continue
+                    del rows_by_key[evictable.pop(0)]
+                rows_by_key[key] = (generation, row)
+                if seeded:
+                    self._seeded.add(key)
+                elif new:
+                    # Re-scoring a stale entry is not a promotion
+                    self.promotions += 1
+            self._rows = rows_by_key
+    
+    def invalidate(self):
+        """Mark every row stale (the model changed); rows and miss counts are kept"""
+        with self._lock:
+            self._generation += 1
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses
+        generation = self._generation
+        return {
+            "size": len(self._rows),
+            "current": sum(entry[0] == generation for entry in list(self._rows.values())),
+            "seeded": len(self._seeded),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "promotions": self.promotions
+        }
@@ -0,0 +1,115 @@
+from collections import deque
+from typing import Dict, List, Set, Tuple
+from prompt_analysis import tokenize
+
+# Inflections accepted on the last word of a keyword ("script" also matches "scripts")
+KEYWORD_SUFFIXES = ("", "s", "es")
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over word tokens for the task keyword table
+    
+    The automaton is built once; matching is a single linear pass over the prompt's
+    tokens regardless of how many keywords the table holds. Because it walks whole
+    tokens, keywords only match complete words ("add" does not match "address").
+    """
+    
+    def __init__(self, keyword_table: Dict[str, List[str]]):
+        """
+        Args:
+            keyword_table: Keywords per task type; multi-word keywords are allowed
+        """
+        self.patterns: List[Tuple[str, str]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        
+        for task_type, keywords in keyword_table.items():
+            for keyword in keywords:
+                pattern_id = len(self.patterns)
+                self.patterns.append((getattr(task_type, "value", task_type), keyword))
+                words = tokenize(keyword)
+                if not words:
+                    raise ValueError(f"Keyword has no matchable words: {keyword!r}")
+                for suffix in KEYWORD_SUFFIXES:
+                    self._add_pattern(words[:-1] + [words[-1] + suffix], pattern_id)
+        
+        self._build_failure_links()
+    
+    def _add_pattern(self, words: List[str], pattern_id: int):
+        """Insert one token sequence into the trie"""
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if pattern_id not in self._output[state]:
+            self._output[state].append(pattern_id)
+    
+    def _build_failure_links(self):
+        """Breadth-first construction of failure links and merged outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(word, 0)
+                self._output[next_state].extend(
+                    pattern_id for pattern_id in self._output[self._fail[next_state]]
+                    if pattern_id not in self._output[next_state]
+                )
+    
+    def match_tokens(self, tokens: List[str]) -> Dict[str, List[str]]:
+        """
+        Find all keywords in a token sequence
+        
+        Returns:
+            Dict mapping task type to matched keywords, in keyword table order
+        """
+        found = set()
+        self.advance(0, tokens, found)
+        return self.collect(found)
+    
+    def advance(self, state: int, tokens: List[str], found: Set[int]) -> int:
+        """
+        Run the automaton over tokens from a given state, for streaming a text in pieces
+        
+        Args:
+            state: Automaton state after the previous piece (0 to start)
+            tokens: Next tokens
+            found: Set collecting matched pattern ids
+            
+        Returns:
+            State to continue from with the following piece
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found.update(output[state])
+        return state
+    
+    def collect(self, found: Set[int]) -> Dict[str, List[str]]:
+        """Group matched pattern ids by task type, in keyword table order"""
+        matches = {}
+        for pattern_id in sorted(found):
+            task_type, keyword = self.patterns[pattern_id]
+            matches.setdefault(task_type, []).append(keyword)
+        return matches
+    
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Find all keywords in a prompt"""
+        return self.match_tokens(tokenize(text))
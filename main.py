@@ -1,12 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
-from typing import List, Dict
-from models import AccessRequest, AccessResponse, User, Task
+from typing import List
+from models import AccessRequest, AccessResponse, MapRequest, BatchMapRequest, TrainingExamplesRequest, User, Task
 from access_controller import AccessController
+from model_registry import ModelValidationError
 from mcp_connectors import MCPManager
-from data import USERS, TASKS
+from data import USERS
 
 app = FastAPI(title="Task-Based Access Pattern Model", version="1.0.0")
 
@@ -298,7 +300,23 @@ async def get_users() -> List[User]:
 @app.get("/tasks")
 async def get_tasks() -> List[Task]:
     """Get all tasks"""
-    return TASKS
+    return access_controller.task_mapper.catalog.tasks
+
+@app.post("/tasks/examples")
+async def add_task_examples(request: TrainingExamplesRequest):
+    """Stream reviewed labeled prompts into the live task mapping model"""
+    if not request.examples:
+        raise HTTPException(status_code=400, detail="At least one example is required")
+    
+    try:
+        with access_controller.model_registry.lease() as task_mapper:
+            return await run_in_threadpool(
+                task_mapper.add_examples,
+                [example.text for example in request.examples],
+                [example.task_id for example in request.examples]
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/users/{user_id}/permissions")
 async def get_user_permissions(user_id: str):
@@ -313,26 +331,87 @@ async def get_user_tasks(user_id: str):
     return {"user_id": user_id, "allowed_tasks": tasks}
 
 @app.post("/map-tasks")
-async def map_tasks(request: Dict[str, str]):
+async def map_tasks(request: MapRequest):
     """Map a prompt to tasks"""
-    prompt = request.get("prompt", "")
+    prompt = request.prompt
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt is required")
     
-    mapped_tasks = access_controller.task_mapper.map_prompt_to_tasks(prompt)
-    keywords = access_controller.task_mapper.analyze_prompt_keywords(prompt)
+    # Mapping runs in the threadpool, so concurrent requests can share a micro-batch
+    with access_controller.model_registry.lease() as task_mapper:
+        analysis = await run_in_threadpool(task_mapper.analyze, prompt, multi_intent=request.multi_intent)
     
     return {
         "prompt": prompt,
-        "mapped_tasks": mapped_tasks,
-        "keywords": keywords
+        "mapped_tasks": analysis["mapped_tasks"],
+        "keywords": analysis["keywords"],
+        "truncated": analysis["truncated"],
+        "sketched": analysis["sketched"]
     }
 
+@app.post("/map-tasks/batch")
+async def map_tasks_batch(request: BatchMapRequest):
+    """Map a batch of prompts to tasks in a single scoring pass"""
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="At least one prompt is required")
+    if request.top_k is not None and request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    
+    with access_controller.model_registry.lease() as task_mapper:
+        results = await run_in_threadpool(
+            task_mapper.map_prompts_to_tasks,
+            request.prompts, threshold=request.threshold, top_k=request.top_k,
+            multi_intent=request.multi_intent
+        )
+    
+    return {
+        "results": [
+            {"prompt": prompt, "mapped_tasks": mapped_tasks}
+            for prompt, mapped_tasks in zip(request.prompts, results)
+        ]
+    }
+
+@app.get("/mapper/stats")
+async def get_mapper_stats():
+    """Get task mapper runtime statistics"""
+    with access_controller.model_registry.lease() as task_mapper:
+        return {
+            "model": access_controller.model_registry.status(),
+            "cache": task_mapper.cache_stats(),
+            "fast_path": task_mapper.fast_path_stats(),
+            "cascade": task_mapper.cascade_stats(),
+            "embedding_cache": task_mapper.embedding_cache_stats(),
+            "memory": task_mapper.memory_report()
+        }
+
+@app.post("/admin/reload-model", status_code=202)
+async def reload_model(wait: bool = False):
+    """
+    Rebuild the task mapper from the current tasks and sample prompts in data.py,
+    validate it on the golden prompts and swap it in without dropping requests
+    """
+    registry = access_controller.model_registry
+    if not wait:
+        if not registry.reload_async():
+            raise HTTPException(status_code=409, detail="A model reload is already in progress")
+        return registry.status()
+    
+    try:
+        return await run_in_threadpool(registry.reload)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ModelValidationError as e:
+        raise HTTPException(status_code=422, detail={"error": str(e), "validation": e.validation})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
+
 @app.post("/evaluate-access")
 async def evaluate_access(request: AccessRequest) -> AccessResponse:
     """Evaluate an access request"""
     try:
-        return access_controller.evaluate_access_request(request)
+        return await run_in_threadpool(access_controller.evaluate_access_request, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error evaluating access: {str(e)}")
 
@@ -341,7 +420,7 @@ async def execute_tool_calls(request: AccessRequest):
     """Execute tool calls after access evaluation"""
     try:
         # First evaluate access
-        access_response = access_controller.evaluate_access_request(request)
+        access_response = await run_in_threadpool(access_controller.evaluate_access_request, request)
         
         if not access_response.allowed:
             return {
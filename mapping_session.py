@@ -0,0 +1,156 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from prompt_analysis import PARTIAL_TOKEN_PATTERN, PromptAnalyzer, tokenize
+
+class SessionIndex:
+    """
+    Snapshot of the fitted rows a session scores against
+    
+    Holds the row index together with its column-major copy, so a new feature only
+    touches the rows that actually contain it.
+    """
+    
+    def __init__(self, row_index, columns):
+        """
+        Args:
+            row_index: TaskRowIndex with sparse rows
+            columns: The same rows as a CSC matrix
+        """
+        self.row_index = row_index
+        self.columns = columns
+
+class MappingSession:
+    """
+    Incremental mapping of a prompt that arrives in fragments (e.g. a chat stream)
+    
+    Fragments are tokenized as they arrive; a trailing partial word is held back
+    until the next fragment shows whether it continues. Each completed token adds
+    its n-grams, and for every feature whose count changes only the rows containing
+    it are updated: the session keeps unnormalized dot products against every row
+    and the squared norm of the prompt's TF-IDF vector, so current scores are one
+    division and one per-task reduction away. The rows and idf weights are the
+    model's at the time the session was opened.
+    
+    Sessions are not thread-safe; use one per stream. Cascade escalation and ANN
+    candidate pruning do not apply: rows are scored exactly by the first stage.
+    """
+    
+    def __init__(self, mapper, indexes: List[SessionIndex], idf: np.ndarray,
+                 threshold: float = 0.3, persona=None, global_fallback: bool = False,
+                 top_k: Optional[int] = None):
+        """
+        Args:
+            mapper: TaskMapper the session belongs to (task positions and selection)
+            indexes: Row snapshots to score (fitted rows, then rows not yet compacted)
+            idf: idf weight per feature column
+            threshold: Minimum confidence score for task matching
+            persona: Only report tasks owned by this persona (None for all tasks)
+            global_fallback: Report all tasks while nothing in the persona's partition matches
+            top_k: Report at most this many of the best tasks (None for all matches)
+        """
+        self.mapper = mapper
+        self.indexes = indexes
+        self.idf = idf
+        self.threshold = threshold
+        self.persona = persona
+        self.global_fallback = global_fallback
+        self.top_k = top_k
+        self.analyzer: PromptAnalyzer = mapper.prompt_analyzer
+        # A refit replaces the mapper's vectorizer; keep the one the rows belong to
+        self.vectorizer = mapper.vectorizer
+        self.text = ""
+        self.finished = False
+        self._partial = ""
+        self._history = []
+        self._counts = Counter()
+        self._weights = {}
+        self._norm2 = 0.0
+        self._dots = [np.zeros(index.columns.shape[0]) for index in indexes]
+    
+    def feed(self, fragment: str) -> "MappingSession":
+        """Append a fragment of the prompt"""
+        if self.finished:
+            raise ValueError("Session is already finished")
+        self.text += fragment
+        pending = self._partial + fragment
+        cut = PARTIAL_TOKEN_PATTERN.search(pending).start()
+        self._partial = pending[cut:]
+        self._add_tokens(tokenize(pending[:cut]))
+        return self
+    
+    def finish(self) -> List[Tuple[str, float]]:
+        """Flush the held-back partial word and return the final mapping"""
+        if not self.finished:
+            self._add_tokens(tokenize(self._partial))
+            self._partial = ""
+            self.finished = True
+        return self.top_tasks()
+    
+    def _add_tokens(self, tokens: List[str]):
+        """Count the n-grams completed by new tokens and update the touched rows"""
+        min_n, max_n = self.analyzer.ngram_range
+        features = []
+        for token in self.analyzer.content_tokens(tokens):
+            self._history.append(token)
+            # N-grams ending at a new token reach back at most max_n tokens
+            if len(self._history) > max_n:
+                del self._history[0]
+            for n in range(min_n, min(max_n, len(self._history)) + 1):
+                features.append(" ".join(self._history[-n:]))
+        if not features:
+            return
+        
+        new_counts = Counter(features)
+        self._counts.update(new_counts)
+        columns = self.vectorizer.term_columns(list(new_counts))
+        
+        # Several features can share a column (hash collisions); combine them first
+        deltas = {}
+        for column, count in zip(columns.tolist(), new_counts.values()):
+            if column >= 0:
+                deltas[column] = deltas.get(column, 0.0) + count * self.idf[column]
+        
+        for column, delta in deltas.items():
+            weight = self._weights.get(column, 0.0)
+            self._weights[column] = weight + delta
+            self._norm2 += (weight + delta) ** 2 - weight ** 2
+            for index, dots in zip(self.indexes, self._dots):
+                start, end = index.columns.indptr[column], index.columns.indptr[column + 1]
+                dots[index.columns.indices[start:end]] += delta * index.columns.data[start:end]
+    
+    def scores(self) -> np.ndarray:
+        """Current per-task scores over all tasks"""
+        n_tasks = len(self.mapper.task_index)
+        norm = np.sqrt(self._norm2) if self._norm2 > 0 else 1.0
+        scores = None
+        for index, dots in zip(self.indexes, self._dots):
+            index_scores = index.row_index.max_scores((dots / norm)[None, :], n_tasks)[0]
+            scores = index_scores if scores is None else np.maximum(scores, index_scores)
+        return scores
+    
+    def top_tasks(self) -> List[Tuple[str, float]]:
+        """
+        Best tasks for the prompt so far (the held-back partial word is not counted)
+        
+        Returns:
+            List of (task_id, confidence_score) tuples
+        """
+        scores = self.scores()[None, :]
+        if self.persona is not None:
+            task_start, task_end = self.mapper.persona_task_ranges[self.persona]
+            partition = np.full_like(scores, -np.inf)
+            partition[:, task_start:task_end] = scores[:, task_start:task_end]
+            result = self.mapper._select_tasks(partition, self.threshold, self.top_k)[0]
+            if result or not self.global_fallback:
+                return result
+        return self.mapper._select_tasks(scores, self.threshold, self.top_k)[0]
+    
+    def stats(self) -> Dict:
+        """Size of the session's state"""
+        return {
+            "chars": len(self.text),
+            "features": len(self._counts),
+            "columns": len(self._weights),
+            "finished": self.finished
+        }
@@ -0,0 +1,237 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from models import Task
+from task_mapper import TaskMapper
+import data
+
+# Share of golden prompts whose top task must be an expected task before a swap
+DEFAULT_MIN_TOP1 = 0.8
+
+class ModelValidationError(ValueError):
+    """A candidate model did not pass golden-set validation"""
+    
+    def __init__(self, message: str, validation: Dict):
+        super().__init__(message)
+        self.validation = validation
+
+def load_training_data() -> Tuple[List[Task], List[Dict]]:
+    """Re-read task definitions and labeled prompts from data.py"""
+    module = importlib.reload(data)
+    return module.TASKS, module.SAMPLE_PROMPTS
+
+def validate_mapper(mapper: TaskMapper, golden_prompts: List[Dict], min_top1: float) -> Dict:
+    """
+    Check a mapper against labeled golden prompts
+    
+    Prompts expecting tasks the mapper does not know (e.g. removed tasks) are skipped.
+    
+    Returns:
+        Dict with the number of prompts checked, top-1 accuracy and whether it passed
+    """
+    prompts = [p for p in golden_prompts if all(task_id in mapper.tasks for task_id in p["expected_tasks"])]
+    if not prompts:
+        return {"prompts": 0, "top1": 0.0, "min_top1": min_top1, "passed": False}
+    
+    results = mapper.map_prompts_to_tasks([p["text"] for p in prompts])
+    hits = sum(bool(mapped) and mapped[0][0] in p["expected_tasks"] for p, mapped in zip(prompts, results))
+    top1 = hits / len(prompts)
+    return {"prompts": len(prompts), "top1": top1, "min_top1": min_top1, "passed": top1 >= min_top1}
+
+class ModelRegistry:
+    """
+    Double-buffered holder of the live TaskMapper
+    
+    A reload builds a complete new mapper next to the live one, validates it on a
+    golden prompt set and only then replaces the reference in a single assignment.
+    Callers hold a `lease()` on the mapper they use: a replaced mapper keeps serving
+    its in-flight leases and is closed when the last one is released, so requests
+    are never interrupted and its resources (worker pools, shared memory, encoder
+    threads) are not leaked. A rejected or failed candidate is closed and the live
+    mapper is left untouched.
+    """
+    
+    def __init__(self, mapper_factory: Callable[[List[Task], List[Dict]], TaskMapper],
+                 golden_prompts: Optional[List[Dict]] = None, min_top1: float = DEFAULT_MIN_TOP1,
+                 loader: Callable[[], Tuple[List[Task], List[Dict]]] = load_training_data):
+        """
+        Args:
+            mapper_factory: Builds a mapper from task definitions and labeled prompts
+            golden_prompts: Labeled prompts a candidate must map correctly
+                (default: the sample and evaluation prompts)
+            min_top1: Minimum golden-set top-1 accuracy for a swap
+            loader: Returns the current (tasks, sample_prompts) for a reload
+        """
+        self.mapper_factory = mapper_factory
+        self.golden_prompts = golden_prompts if golden_prompts is not None else (
+            data.SAMPLE_PROMPTS + data.EVALUATION_PROMPTS
+        )
+        self.min_top1 = min_top1
+        self.loader = loader
+        self.version = 1
+        self.loaded_at = time.time()
+        self.last_reload = None
+        self._current = mapper_factory(data.TASKS, data.SAMPLE_PROMPTS)
+        self._reload_lock = threading.Lock()
+        # Open leases per mapper, and replaced mappers waiting for theirs to end
+        self._lease_lock = threading.Lock()
+        self._leases: Dict[TaskMapper, int] = {}
+        self._retired = set()
+    
+    @property
+    def current(self) -> TaskMapper:
+        """The live mapper; use `lease()` for calls that must outlive a swap"""
+        return self._current
+    
+    @contextmanager
+    def lease(self) -> Iterator[TaskMapper]:
+        """
+        Use the live mapper for the duration of a block
+        
+        The mapper stays open until the block exits, even if a reload replaces it
+        in the meantime.
+        """
+        with self._lease_lock:
+            mapper = self._current
+            self._leases[mapper] = self._leases.get(mapper, 0) + 1
+        try:
+            yield mapper
+        finally:
+            with self._lease_lock:
+                self._leases[mapper] -= 1
+                close = False
+                if not self._leases[mapper]:
+                    del self._leases[mapper]
+                    close = mapper in self._retired
+                    self._retired.discard(mapper)
+            if close:
+                mapper.close()
+    
+    def _retire(self, mapper: TaskMapper):
+        """Close a replaced mapper now, or when its last lease is released"""
+        with self._lease_lock:
+            if self._leases.get(mapper):
+                self._retired.add(mapper)
+                return
+        mapper.close()
+    
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+    
+    def reload(self) -> Dict:
+        """
+        Build, validate and swap in a new mapper from freshly loaded training data
+        
+        Returns:
+            Status of the reload
+            
+        Raises:
+            RuntimeError: If another reload is already running
+            ModelValidationError: If the candidate fails golden-set validation
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError("A model reload is already in progress")
+        try:
+            return self._reload()
+        finally:
+            self._reload_lock.release()
+    
+    def reload_async(self) -> bool:
+        """
+        Start a reload in a background thread
+        
+        Returns:
+            False if another reload is already running
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                self._reload()
+            except Exception:
+                # Outcome is recorded in last_reload; the live mapper is unaffected
+                pass
+            finally:
+                self._reload_lock.release()
+        
+        threading.Thread(target=run, name="model-reload", daemon=True).start()
+        return True
+    
+    def _reload(self) -> Dict:
+        """Reload body; the caller holds the reload lock"""
+        started = time.time()
+        candidate = None
+        try:
+            tasks, sample_prompts = self.loader()
+            previous = self._current
+            replayed = len(previous.added_examples)
+            candidate = self.mapper_factory(tasks, sample_prompts)
+            
+            # Examples streamed into the live model are carried over (for tasks that still exist)
+            self._replay_examples(candidate, previous.added_examples[:replayed])
+            
+            validation = validate_mapper(candidate, self.golden_prompts, self.min_top1)
+            if not validation["passed"]:
+                raise ModelValidationError(
+                    f"Candidate model top-1 accuracy {validation['top1']:.3f} is below {self.min_top1}",
+                    validation
+                )
+            
+            # Examples added while the candidate was building, then the swap itself
+            with previous._update_lock:
+                self._replay_examples(candidate, previous.added_examples[replayed:])
+                with self._lease_lock:
+                    self._current = candidate
+                self.version += 1
+                self.loaded_at = time.time()
+        except ModelValidationError as e:
+            candidate.close()
+            self.last_reload = self._outcome("rejected", started, validation=e.validation, error=str(e))
+            raise
+        except Exception as e:
+            if candidate is not None:
+                candidate.close()
+            self.last_reload = self._outcome("failed", started, error=str(e))
+            raise
+        
+        self._retire(previous)
+        self.last_reload = self._outcome("swapped", started, validation=validation)
+        return self.last_reload
+    
+    @staticmethod
+    def _replay_examples(mapper: TaskMapper, examples: List[Dict]):
+        """Add streamed examples to a mapper, skipping those for unknown tasks"""
+        texts = []
+        task_ids = []
+        for example in examples:
+            for task_id in example["expected_tasks"]:
+                if task_id in mapper.tasks:
+                    texts.append(example["text"])
+                    task_ids.append(task_id)
+        if texts:
+            mapper.add_examples(texts, task_ids)
+    
+    def _outcome(self, status: str, started: float, validation: Optional[Dict] = None,
+                 error: Optional[str] = None) -> Dict:
+        return {
+            "status": status,
+            "version": self.version,
+            "started_at": started,
+            "duration_ms": (time.time() - started) * 1e3,
+            "validation": validation,
+            "error": error
+        }
+    
+    def status(self) -> Dict:
+        """Live model version and the outcome of the last reload"""
+        return {
+            "version": self.version,
+            "fingerprint": self._current.fingerprint,
+            "loaded_at": self.loaded_at,
+            "reloading": self.reloading,
+            "last_reload": self.last_reload
+        }
@@ -0,0 +1,110 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import Dict, List, Optional, Tuple, Any
+import numpy as np
+from models import Task
+
+# Bump whenever the on-disk layout or the meaning of a stored array changes
+ARTIFACT_VERSION = 5
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_artifacts")
+
+METADATA_FILE = "metadata.json"
+
+def training_fingerprint(tasks: List[Task], sample_prompts: List[Dict], config: Dict[str, Any]) -> str:
+    """
+    Compute a content hash of everything that determines a trained model
+    
+    Args:
+        tasks: Task definitions used for training
+        sample_prompts: Labeled sample prompts used for training
+        config: Model configuration (vectorizer parameters, scoring mode, ...)
+        
+    Returns:
+        Hex digest identifying the training data and configuration
+    """
+    payload = {
+        "version": ARTIFACT_VERSION,
+        "tasks": [task.model_dump(mode="json") for task in tasks],
+        "sample_prompts": sample_prompts,
+        "config": config
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def artifact_path(artifact_dir: str, fingerprint: str) -> str:
+    """Directory holding the artifact for a given fingerprint"""
+    return os.path.join(artifact_dir, f"task_mapper-v{ARTIFACT_VERSION}-{fingerprint[:16]}")
+
+def save_artifact(path: str, fingerprint: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> bool:
+    """
+    Atomically write a model artifact
+    
+    Arrays are stored as individual .npy files so they can be memory-mapped on load.
+    The artifact is assembled in a temporary directory and renamed into place, so
+    concurrent workers never observe a partially written artifact.
+    
+    Args:
+        path: Target artifact directory
+        fingerprint: Training fingerprint the artifact belongs to
+        arrays: Named NumPy arrays to persist
+        metadata: JSON-serializable metadata
+        
+    Returns:
+        True if the artifact was written, False otherwise
+    """
+    parent = os.path.dirname(path)
+    try:
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    except OSError:
+        return False
+    
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        
+        with open(os.path.join(tmp_path, METADATA_FILE), "w") as f:
+            json.dump({
+                "version": ARTIFACT_VERSION,
+                "fingerprint": fingerprint,
+                "arrays": sorted(arrays),
+                "metadata": metadata
+            }, f)
+        
+        os.rename(tmp_path, path)
+        return True
+    except OSError:
+        # Another worker may have published the same artifact first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return False
+
+def load_artifact(path: str, fingerprint: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """
+    Load a model artifact with its arrays memory-mapped read-only
+    
+    Args:
+        path: Artifact directory
+        fingerprint: Expected training fingerprint
+        
+    Returns:
+        (arrays, metadata) if a matching artifact exists, None otherwise
+    """
+    try:
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            header = json.load(f)
+        
+        if header.get("version") != ARTIFACT_VERSION or header.get("fingerprint") != fingerprint:
+            return None
+        
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in header["arrays"]
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    
+    return arrays, header["metadata"]
@@ -53,6 +53,23 @@ class ToolCall(BaseModel):
     action: str
     parameters: Dict = {}
 
+class MapRequest(BaseModel):
+    prompt: str = ""
+    multi_intent: bool = False
+
+class BatchMapRequest(BaseModel):
+    prompts: List[str]
+    threshold: float = 0.3
+    top_k: Optional[int] = None
+    multi_intent: bool = False
+
+class TrainingExample(BaseModel):
+    text: str
+    task_id: str
+
+class TrainingExamplesRequest(BaseModel):
+    examples: List[TrainingExample]
+
 class AccessRequest(BaseModel):
     user_id: str
     prompt: str
@@ -0,0 +1,94 @@
+import re
+from typing import Dict, List, Optional, Tuple, Union
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from token_normalizer import TokenNormalizer
+
+# Same token definition as scikit-learn's default word analyzer
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+# Trailing word characters of a fragment may be the start of a longer token
+PARTIAL_TOKEN_PATTERN = re.compile(r"\w*\Z")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of two or more characters"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class PromptAnalysis:
+    """A prompt tokenized once, shared by TF-IDF scoring and keyword matching"""
+    
+    __slots__ = ("text", "tokens", "ngrams", "term_counts", "truncated", "sketched")
+    
+    def __init__(self, text: str, tokens: List[str], ngrams: List[str],
+                 term_counts: Optional[Dict[str, int]] = None, truncated: bool = False,
+                 sketched: bool = False):
+        """
+        Args:
+            text: Original prompt text (its leading part when the prompt was truncated)
+            tokens: All word tokens as written, including stop words (used for keyword matching)
+            ngrams: Vectorizer features: stop-word-free tokens and their n-grams
+            term_counts: Feature counts standing in for ngrams (set for budgeted prompts)
+            truncated: Part of the prompt was not read
+            sketched: term_counts are approximate heavy-hitter counts
+        """
+        self.text = text
+        self.tokens = tokens
+        self.ngrams = ngrams
+        self.term_counts = term_counts
+        self.truncated = truncated
+        self.sketched = sketched
+
+class PromptAnalyzer:
+    """
+    Tokenize-once analysis stage, usable as a scikit-learn vectorizer analyzer
+    
+    Passed as `analyzer=` to a vectorizer, it accepts either raw strings or
+    PromptAnalysis objects, so a prompt analyzed up front is never re-tokenized.
+    Features match TfidfVectorizer(stop_words='english', ngram_range=...), unless a
+    normalizer folds tokens to their stems or lemmas first.
+    """
+    
+    def __init__(self, stop_words: Optional[str] = "english", ngram_range: Tuple[int, int] = (1, 2),
+                 normalizer: Optional[TokenNormalizer] = None):
+        """
+        Args:
+            stop_words: "english" for scikit-learn's English list, or None
+            ngram_range: Inclusive (min_n, max_n) n-gram sizes
+            normalizer: Stems or lemmatizes content tokens before n-grams are formed
+                (None keeps tokens as written)
+        """
+        if stop_words not in ("english", None):
+            raise ValueError(f"Unsupported stop word list: {stop_words}")
+        
+        self.stop_words = stop_words
+        self.ngram_range = tuple(ngram_range)
+        self.normalizer = normalizer
+        self._stop_words = ENGLISH_STOP_WORDS if stop_words == "english" else frozenset()
+    
+    def __repr__(self) -> str:
+        # Stable across processes: the repr feeds the model fingerprint
+        if self.normalizer is None:
+            return f"PromptAnalyzer(stop_words={self.stop_words!r}, ngram_range={self.ngram_range!r})"
+        return (f"PromptAnalyzer(stop_words={self.stop_words!r}, ngram_range={self.ngram_range!r}, "
+                f"normalizer={self.normalizer!r})")
+    
+    def __call__(self, doc: Union[str, PromptAnalysis]) -> List[str]:
+        if isinstance(doc, PromptAnalysis):
+            return doc.ngrams
+        return self.analyze(doc).ngrams
+    
+    def analyze(self, text: str) -> PromptAnalysis:
+        """Tokenize a prompt once and derive its vectorizer features"""
+        tokens = tokenize(text)
+        return PromptAnalysis(text, tokens, self.ngrams(self.content_tokens(tokens)))
+    
+    def content_tokens(self, tokens: List[str]) -> List[str]:
+        """Tokens that form features: stop words removed, then normalized"""
+        content = [t for t in tokens if t not in self._stop_words]
+        return self.normalizer(content) if self.normalizer is not None else content
+    
+    def ngrams(self, tokens: List[str]) -> List[str]:
+        """Space-joined n-grams of a token sequence over the configured range"""
+        min_n, max_n = self.ngram_range
+        features = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            features.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return features
@@ -0,0 +1,129 @@
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from prompt_analysis import PARTIAL_TOKEN_PATTERN, PromptAnalysis, PromptAnalyzer, tokenize
+from keyword_matcher import KeywordMatcher
+
+class TermSketch:
+    """
+    Fixed-size heavy-hitter sketch of term counts
+    
+    Counts are exact until more than 2 * max_terms distinct terms are held; then only
+    the max_terms most frequent survive. Frequent terms keep (nearly) exact counts,
+    rare terms are dropped, and memory stays bounded by the capacity.
+    """
+    
+    def __init__(self, max_terms: int = 512):
+        """
+        Args:
+            max_terms: Terms kept after each prune
+        """
+        if max_terms < 1:
+            raise ValueError("max_terms must be at least 1")
+        self.max_terms = max_terms
+        self.counts = Counter()
+        self.pruned = False
+    
+    def add(self, terms: Iterable[str]):
+        """Count a batch of terms"""
+        self.counts.update(terms)
+        if len(self.counts) > 2 * self.max_terms:
+            self.counts = Counter(dict(self.counts.most_common(self.max_terms)))
+            self.pruned = True
+    
+    def top(self) -> Dict[str, int]:
+        """The max_terms heaviest terms and their counts"""
+        if len(self.counts) <= self.max_terms:
+            return dict(self.counts)
+        self.pruned = True
+        return dict(self.counts.most_common(self.max_terms))
+
+class PromptBudget:
+    """
+    Bounded-cost analysis of very large prompts (log dumps, pasted files)
+    
+    The prompt is streamed in chunks; each chunk is tokenized, its n-grams are added
+    to a TermSketch and its tokens advance the keyword automaton, so memory is one
+    chunk plus the sketch. At most max_scan_chars characters are read, and the
+    scorer sees at most max_terms features, which caps mapping cost regardless of
+    the prompt's size.
+    """
+    
+    def __init__(self, analyzer: PromptAnalyzer, max_chars: int = 4096, chunk_chars: int = 8192,
+                 max_terms: int = 512, max_scan_chars: int = 1 << 18):
+        """
+        Args:
+            analyzer: Analyzer whose stop words and n-gram range the features follow
+            max_chars: Prompts longer than this are budgeted; it is also the length
+                of the text kept for backends that encode raw text
+            chunk_chars: Characters tokenized per chunk
+            max_terms: Features kept in the term sketch
+            max_scan_chars: Characters read at most; the rest is ignored
+        """
+        if chunk_chars < 1:
+            raise ValueError("chunk_chars must be at least 1")
+        self.analyzer = analyzer
+        self.max_chars = max_chars
+        self.chunk_chars = chunk_chars
+        self.max_terms = max_terms
+        self.max_scan_chars = max_scan_chars
+    
+    def applies(self, text: str) -> bool:
+        """Whether a prompt is large enough to be budgeted"""
+        return len(text) > self.max_chars
+    
+    def _chunks(self, text: str) -> Iterator[str]:
+        """Chunks of the scanned text, cut between tokens so none is split"""
+        end = min(len(text), self.max_scan_chars)
+        start = 0
+        while start < end:
+            stop = min(start + self.chunk_chars, end)
+            if stop < end:
+                # Hold back the trailing run of word characters: it may continue past
+                # the cut. Tokens are runs of word characters, so any non-word
+                # character (space, tab, comma, slash...) is a safe place to cut
+                cut = PARTIAL_TOKEN_PATTERN.search(text, start, stop).start()
+                if cut > start:
+                    stop = cut
+            yield text[start:stop]
+            start = stop
+    
+    def analyze(self, text: str,
+                keyword_matcher: Optional[KeywordMatcher] = None) -> Tuple[PromptAnalysis, Optional[Dict]]:
+        """
+        Stream a prompt into a sketched analysis
+        
+        Args:
+            text: Prompt text
+            keyword_matcher: Also find task keywords while streaming (None to skip)
+            
+        Returns:
+            (analysis carrying term_counts, keyword matches or None)
+        """
+        sketch = TermSketch(self.max_terms)
+        min_n, max_n = self.analyzer.ngram_range
+        
+        found = set()
+        state = 0
+        carry = []
+        for chunk in self._chunks(text):
+            tokens = tokenize(chunk)
+            if keyword_matcher is not None:
+                state = keyword_matcher.advance(state, tokens, found)
+            
+            # The previous chunk's last tokens are prepended so n-grams spanning the
+            # cut are counted; n-grams lying entirely within them were counted already
+            window = carry + self.analyzer.content_tokens(tokens)
+            features = []
+            for n in range(min_n, max_n + 1):
+                for i in range(max(0, len(carry) - n + 1), len(window) - n + 1):
+                    features.append(" ".join(window[i:i + n]))
+            sketch.add(features)
+            carry = window[len(window) - (max_n - 1):] if max_n > 1 else []
+        
+        term_counts = sketch.top()
+        analysis = PromptAnalysis(
+            text[:self.max_chars], [], [], term_counts=term_counts,
+            truncated=len(text) > self.max_scan_chars, sketched=sketch.pruned
+        )
+        keywords = keyword_matcher.collect(found) if keyword_matcher is not None else None
+        return analysis, keywords
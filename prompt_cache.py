@@ -0,0 +1,111 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+TICKET_PATTERN = re.compile(r"#\d+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so retries and near-identical prompts share a cache key
+    
+    Lowercases, collapses whitespace and replaces ticket numbers such as #1234
+    with a placeholder.
+    """
+    normalized = TICKET_PATTERN.sub("#<ticket>", prompt.lower())
+    return WHITESPACE_PATTERN.sub(" ", normalized).strip()
+
+class PromptCache:
+    """
+    Thread-safe LRU cache with optional time-to-live for prompt mapping results
+    
+    clear() starts a new generation. A result computed before a clear is refused by
+    put() when the caller passes the generation it read before computing it, so a
+    slow batch cannot repopulate the cache with the previous model's answers.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_size: Maximum number of cached entries
+            ttl: Seconds an entry stays valid (None for no expiry)
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @property
+    def generation(self) -> int:
+        """Incremented by every clear(); read it before computing values to put"""
+        return self._generation
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        Store a value, evicting the least recently used entry when full
+        
+        Args:
+            key: Cache key
+            value: Value to store
+            generation: Generation read before the value was computed; the value is
+                dropped if the cache has been cleared since (None to always store)
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all cached entries and start a new generation (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
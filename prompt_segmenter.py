@@ -0,0 +1,70 @@
+import re
+from typing import List
+from prompt_analysis import PromptAnalyzer, tokenize
+
+# Sentence ends and explicit sequencing connectives always separate intents
+CLAUSE_BOUNDARY = re.compile(
+    r"[.;!?]+(?=\s|$)|\n+|,?\s+\b(?:and then|then|and also|also|after that|afterwards|as well as|plus)\b\s+",
+    re.IGNORECASE
+)
+# A bare "and" only separates intents when both sides are full clauses ("I need read and write access" is one)
+CONJUNCTION = re.compile(r",?\s+\band\b\s+", re.IGNORECASE)
+
+class IntentSegmenter:
+    """
+    Split a prompt into clauses that may each carry a separate intent
+    
+    "fix the prod bug and then draft the client proposal" becomes
+    ["fix the prod bug", "draft the client proposal"]. Pieces with fewer than
+    min_tokens content words are merged into their neighbour, so short fragments
+    never form a segment of their own.
+    """
+    
+    def __init__(self, analyzer: PromptAnalyzer, min_tokens: int = 2, conjunction_tokens: int = 3,
+                 max_segments: int = 8):
+        """
+        Args:
+            analyzer: Analyzer whose stop words decide what counts as a content word
+            min_tokens: Content words a clause needs to stand alone
+            conjunction_tokens: Content words each side of a bare "and" needs for a split
+            max_segments: Most segments returned per prompt (the tail is merged)
+        """
+        if min_tokens < 1 or max_segments < 1:
+            raise ValueError("min_tokens and max_segments must be at least 1")
+        self.analyzer = analyzer
+        self.min_tokens = min_tokens
+        self.conjunction_tokens = conjunction_tokens
+        self.max_segments = max_segments
+    
+    def _content_tokens(self, text: str) -> int:
+        return sum(token not in self.analyzer._stop_words for token in tokenize(text))
+    
+    def split(self, text: str) -> List[str]:
+        """
+        Clauses of a prompt, in order
+        
+        Returns:
+            A single-element list when the prompt has one intent
+        """
+        pieces = []
+        for clause in CLAUSE_BOUNDARY.split(text):
+            parts = CONJUNCTION.split(clause)
+            if len(parts) > 1 and all(self._content_tokens(part) >= self.conjunction_tokens for part in parts):
+                pieces.extend(parts)
+            else:
+                pieces.append(clause)
+        
+        segments = []
+        for piece in pieces:
+            piece = piece.strip()
+            if not piece:
+                continue
+            if segments and (
+                self._content_tokens(piece) < self.min_tokens
+                or self._content_tokens(segments[-1]) < self.min_tokens
+                or len(segments) == self.max_segments
+            ):
+                segments[-1] = f"{segments[-1]} {piece}"
+            else:
+                segments.append(piece)
+        return segments or [text]
@@ -0,0 +1,151 @@
+import itertools
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import scipy.sparse as sp
+
+# Shard sets are versioned so workers can drop attachments to retired ones
+_generations = itertools.count(1)
+
+# Worker-side state: attached shared memory and row indexes of the current generation
+_attached_generation = None
+_attached_blocks = []
+_attached_indexes = {}
+
+def create_pool(n_workers: int) -> ProcessPoolExecutor:
+    """
+    Persistent scoring processes
+    
+    Workers are spawned rather than forked so they never inherit the parent's
+    threads (micro-batchers, web server) or copy its heap.
+    """
+    return ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _share(array: np.ndarray, blocks: List[shared_memory.SharedMemory]) -> Tuple[str, str, Tuple[int, ...]]:
+    """Copy an array into a new shared memory block; returns its descriptor"""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    blocks.append(block)
+    return block.name, array.dtype.str, array.shape
+
+def _release(blocks: List[shared_memory.SharedMemory]):
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+class ShardedScorer:
+    """
+    Row-sharded scoring of a task row index in a process pool
+    
+    The index's rows are split into contiguous shards whose arrays live in
+    multiprocessing.shared_memory, so every worker maps the same physical pages.
+    A batch is scored by all shards in parallel and the per-task maxima are merged
+    with an element-wise maximum (a task split across shards still gets its best row).
+    """
+    
+    def __init__(self, row_index, n_shards: int, pool: ProcessPoolExecutor):
+        """
+        Args:
+            row_index: TaskRowIndex to shard (sparse or dense rows)
+            n_shards: Number of row shards
+            pool: Persistent worker pool (see create_pool)
+        """
+        self.pool = pool
+        self.generation = next(_generations)
+        self.shards = []
+        blocks = []
+        
+        vectors = row_index.vectors
+        n_rows = vectors.shape[0]
+        bounds = np.linspace(0, n_rows, min(n_shards, max(n_rows, 1)) + 1).astype(int)
+        for shard_id, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            rows = vectors[start:end]
+            if sp.issparse(rows):
+                arrays = {"data": rows.data, "indices": rows.indices, "indptr": rows.indptr}
+            else:
+                arrays = {"vectors": rows}
+            arrays["row_tasks"] = row_index.row_tasks[start:end]
+            self.shards.append({
+                "generation": self.generation,
+                "shard_id": shard_id,
+                "shape": rows.shape,
+                "sparse": sp.issparse(rows),
+                "arrays": {name: _share(array, blocks) for name, array in arrays.items()}
+            })
+        
+        # Shared memory is released once the scorer is garbage collected, so calls
+        # still running on a retired scorer keep working until they finish
+        self.nbytes = sum(block.size for block in blocks)
+        self._finalizer = weakref.finalize(self, _release, blocks)
+    
+    def score(self, prompt_vectors, n_tasks: int,
+              task_range: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Best cosine similarity per task, computed shard by shard in the pool
+        
+        Args:
+            prompt_vectors: (n_prompts, n_features) L2-normalized prompt vectors
+            n_tasks: Total number of task positions
+            task_range: Only score tasks in [start, end) (a persona partition)
+            
+        Returns:
+            (n_prompts, n_tasks) scores; tasks without rows get -inf
+        """
+        futures = [
+            self.pool.submit(_score_shard, shard, prompt_vectors, n_tasks, task_range)
+            for shard in self.shards
+        ]
+        return np.maximum.reduce([future.result() for future in futures])
+    
+    def close(self):
+        """Release the shared memory now"""
+        self._finalizer()
+
+def _attach(shard: Dict):
+    """Row index over a shard's shared memory (worker side), cached per generation"""
+    global _attached_generation, _attached_blocks, _attached_indexes
+    from task_mapper import TaskRowIndex
+    
+    if shard["generation"] != _attached_generation:
+        for block in _attached_blocks:
+            block.close()
+        _attached_generation = shard["generation"]
+        _attached_blocks = []
+        _attached_indexes = {}
+    
+    index = _attached_indexes.get(shard["shard_id"])
+    if index is None:
+        arrays = {}
+        for name, (block_name, dtype, shape) in shard["arrays"].items():
+            block = shared_memory.SharedMemory(name=block_name)
+            _attached_blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        if shard["sparse"]:
+            vectors = sp.csr_matrix(
+                (arrays["data"], arrays["indices"], arrays["indptr"]), shape=shard["shape"], copy=False
+            )
+        else:
+            vectors = arrays["vectors"]
+        index = TaskRowIndex(vectors, arrays["row_tasks"])
+        _attached_indexes[shard["shard_id"]] = index
+    return index
+
+def _score_shard(shard: Dict, prompt_vectors, n_tasks: int,
+                 task_range: Optional[Tuple[int, int]]) -> np.ndarray:
+    """Score one shard (runs in a worker process)"""
+    index = _attach(shard)
+    if task_range is not None:
+        index = index.task_slice(*task_range)
+    return index.score(prompt_vectors, n_tasks)
+
+def default_shards() -> int:
+    """One shard per available CPU"""
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
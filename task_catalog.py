@@ -0,0 +1,117 @@
+import fnmatch
+from collections import defaultdict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping, Optional, Tuple
+from models import Task, TaskType, PersonaType
+
+class TaskCatalog:
+    """
+    Immutable set of task definitions, indexed once for constant-time lookups
+    
+    Indexes by task ID, persona, task type and required resource (type and path
+    pattern) are built at construction. Every lookup returns a precomputed tuple,
+    so callers share results without copying and cannot modify them.
+    """
+    
+    def __init__(self, tasks: Iterable[Task]):
+        """
+        Args:
+            tasks: Task definitions; task IDs must be unique
+            
+        Raises:
+            ValueError: If a task ID occurs more than once
+        """
+        self.tasks: Tuple[Task, ...] = tuple(tasks)
+        
+        by_id = {}
+        duplicates = set()
+        for task in self.tasks:
+            if task.task_id in by_id:
+                duplicates.add(task.task_id)
+            by_id[task.task_id] = task
+        if duplicates:
+            raise ValueError(f"Duplicate task IDs: {', '.join(sorted(duplicates))}")
+        self.by_id: Mapping[str, Task] = MappingProxyType(by_id)
+        
+        by_persona = defaultdict(list)
+        by_type = defaultdict(list)
+        by_resource = defaultdict(list)
+        for task in self.tasks:
+            by_persona[task.persona].append(task)
+            by_type[task.task_type].append(task)
+            # A task is listed once per resource even if several permissions name it
+            for resource in dict.fromkeys(
+                (permission.resource_type, permission.resource_path) for permission in task.required_permissions
+            ):
+                by_resource[resource].append(task)
+        
+        self._by_persona = {persona: tuple(tasks) for persona, tasks in by_persona.items()}
+        self._task_ids_by_persona = {
+            persona: tuple(task.task_id for task in tasks) for persona, tasks in self._by_persona.items()
+        }
+        self._by_type = {task_type: tuple(tasks) for task_type, tasks in by_type.items()}
+        self._by_resource = {resource: tuple(tasks) for resource, tasks in by_resource.items()}
+        
+        by_resource_type = defaultdict(dict)
+        patterns = defaultdict(list)
+        for (resource_type, pattern), tasks in self._by_resource.items():
+            patterns[resource_type].append(pattern)
+            for task in tasks:
+                by_resource_type[resource_type][task.task_id] = task
+        self._by_resource_type = {
+            resource_type: tuple(tasks.values()) for resource_type, tasks in by_resource_type.items()
+        }
+        self._patterns = {resource_type: tuple(values) for resource_type, values in patterns.items()}
+        # Concrete paths repeat across requests; resolve each one against the patterns once
+        self._matching = lru_cache(maxsize=4096)(self._match_path)
+    
+    def __len__(self) -> int:
+        return len(self.tasks)
+    
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self.tasks)
+    
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.by_id
+    
+    def get(self, task_id: str) -> Optional[Task]:
+        """Task with the given ID, or None"""
+        return self.by_id.get(task_id)
+    
+    def by_persona(self, persona: PersonaType) -> Tuple[Task, ...]:
+        """Tasks owned by a persona, in definition order"""
+        return self._by_persona.get(persona, ())
+    
+    def task_ids_by_persona(self, persona: PersonaType) -> Tuple[str, ...]:
+        """IDs of the tasks owned by a persona, in definition order"""
+        return self._task_ids_by_persona.get(persona, ())
+    
+    def by_type(self, task_type: TaskType) -> Tuple[Task, ...]:
+        """Tasks of a task type, in definition order"""
+        return self._by_type.get(task_type, ())
+    
+    def by_resource(self, resource_type: str, path_pattern: Optional[str] = None) -> Tuple[Task, ...]:
+        """
+        Tasks requiring a permission on a resource
+        
+        Args:
+            resource_type: Resource type, e.g. "github" or "filesystem"
+            path_pattern: Exact permission path pattern as defined on the tasks
+                (None for any path of the resource type)
+        """
+        if path_pattern is None:
+            return self._by_resource_type.get(resource_type, ())
+        return self._by_resource.get((resource_type, path_pattern), ())
+    
+    def for_path(self, resource_type: str, resource_path: str) -> Tuple[Task, ...]:
+        """Tasks whose required permission patterns match a concrete resource path"""
+        return self._matching(resource_type, resource_path)
+    
+    def _match_path(self, resource_type: str, resource_path: str) -> Tuple[Task, ...]:
+        matched = {}
+        for pattern in self._patterns.get(resource_type, ()):
+            if fnmatch.fnmatch(resource_path, pattern):
+                for task in self._by_resource[(resource_type, pattern)]:
+                    matched[task.task_id] = task
+        return tuple(matched.values())
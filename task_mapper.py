@@ -1,122 +1,1212 @@
 import re
-from typing import List, Dict, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import sys
+import threading
+import time
+from typing import List, Dict, Tuple, Optional, Union
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import normalize
 import numpy as np
-from models import Task, TaskType, PersonaType
-from data import TASKS, SAMPLE_PROMPTS
+import scipy.sparse as sp
+from models import Task, PersonaType
+from data import TASKS, SAMPLE_PROMPTS, TASK_KEYWORDS
+from model_store import DEFAULT_ARTIFACT_DIR, training_fingerprint, artifact_path, save_artifact, load_artifact
+from prompt_cache import PromptCache, normalize_prompt
+from keyword_matcher import KeywordMatcher
+from prompt_analysis import PromptAnalysis, PromptAnalyzer
+from prompt_budget import PromptBudget
+from prompt_segmenter import IntentSegmenter
+from token_normalizer import TokenNormalizer
+from task_catalog import TaskCatalog
+from vectorizers import IncrementalTfidfVectorizer, HashingTfidfVectorizer
+from ann_index import IVFIndex
+from embedding_backend import DEFAULT_EMBEDDING_MODEL, SentenceEncoder, EmbeddingVectorizer
+from embedding_cache import EmbeddingCache, CachedEncoder
+from sharded_scorer import ShardedScorer, create_pool
+from fast_path import FastPathTable, canonical_prompt
+from mapping_session import MappingSession, SessionIndex
 
-class TaskMapper:
+def stack_rows(blocks: List) -> Union[sp.csr_matrix, np.ndarray]:
+    """Stack row blocks from any backend: sparse TF-IDF rows or dense embeddings"""
+    if sp.issparse(blocks[0]):
+        return sp.vstack(blocks, format="csr")
+    return np.vstack(blocks)
+
+def compact_rows(vectors, dtype: type) -> Union[sp.csr_matrix, np.ndarray]:
+    """Cast row vectors to dtype and, for sparse rows, use int32 CSR index arrays"""
+    if not sp.issparse(vectors):
+        return np.asarray(vectors, dtype=dtype)
+    vectors = sp.csr_matrix(vectors.astype(dtype, copy=False))
+    if vectors.nnz < 2 ** 31:
+        vectors.indices = vectors.indices.astype(np.int32, copy=False)
+        vectors.indptr = vectors.indptr.astype(np.int32, copy=False)
+    return vectors
+
+def nbytes(*arrays) -> int:
+    """Total buffer size of arrays and sparse matrices"""
+    total = 0
+    for array in arrays:
+        if sp.issparse(array):
+            total += array.data.nbytes + array.indices.nbytes + array.indptr.nbytes
+        elif array is not None:
+            total += np.asarray(array).nbytes
+    return total
+
+def is_memory_mapped(array) -> bool:
+    """Whether an array's buffer comes from np.memmap (possibly through views)"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+def dense_similarities(similarities) -> np.ndarray:
+    """Similarity products of sparse rows are sparse; make them a dense array"""
+    return similarities.toarray() if sp.issparse(similarities) else np.asarray(similarities)
+
+class TaskRowIndex:
+    """Training rows grouped by task so per-task maxima reduce in a single NumPy call"""
+    
+    def __init__(self, vectors, row_tasks: np.ndarray):
+        """
+        Args:
+            vectors: Row matrix (one row per training example)
+            row_tasks: Task position of each row
+        """
+        row_tasks = np.asarray(row_tasks)
+        if np.all(row_tasks[:-1] <= row_tasks[1:]):
+            # Already grouped (e.g. a persisted artifact); keep the matrix as-is so
+            # memory-mapped buffers are not copied
+            self.order = np.arange(len(row_tasks))
+            self.vectors = vectors
+            self.row_tasks = row_tasks
+        else:
+            self.order = np.argsort(row_tasks, kind="stable")
+            self.vectors = vectors[self.order]
+            self.row_tasks = row_tasks[self.order]
+        
+        # Rows of the same task are now contiguous; each segment starts at an offset
+        is_start = np.ones(len(self.row_tasks), dtype=bool)
+        is_start[1:] = self.row_tasks[1:] != self.row_tasks[:-1]
+        self.offsets = np.flatnonzero(is_start)
+        self.segment_tasks = self.row_tasks[self.offsets]
+    
+    def max_scores(self, similarities: np.ndarray, n_tasks: int) -> np.ndarray:
+        """
+        Reduce row similarities to the best score per task
+        
+        Args:
+            similarities: (n_prompts, n_rows) similarity matrix in this index's row order
+            n_tasks: Total number of task positions
+            
+        Returns:
+            (n_prompts, n_tasks) matrix; tasks without rows in this index score -inf
+        """
+        scores = np.full((similarities.shape[0], n_tasks), -np.inf, dtype=similarities.dtype)
+        if len(self.offsets):
+            scores[:, self.segment_tasks] = np.maximum.reduceat(similarities, self.offsets, axis=1)
+        return scores
+    
+    def score(self, prompt_vectors, n_tasks: int) -> np.ndarray:
+        """Best cosine similarity per task for a batch of L2-normalized prompt vectors"""
+        # Rows are L2-normalized, so one (sparse or dense) product yields the cosine
+        # similarity of every prompt against every row
+        similarities = dense_similarities(prompt_vectors @ self.vectors.T)
+        return self.max_scores(similarities, n_tasks)
+    
+    def task_slice(self, task_start: int, task_end: int) -> "TaskRowIndex":
+        """
+        Sub-index over a contiguous range of task positions
+        
+        The sub-index views this index's buffers instead of copying them.
+        """
+        row_start, row_end = np.searchsorted(self.row_tasks, [task_start, task_end])
+        if not sp.issparse(self.vectors):
+            return TaskRowIndex(self.vectors[row_start:row_end], self.row_tasks[row_start:row_end])
+        
+        data_start, data_end = self.vectors.indptr[row_start], self.vectors.indptr[row_end]
+        vectors = sp.csr_matrix(
+            (
+                self.vectors.data[data_start:data_end],
+                self.vectors.indices[data_start:data_end],
+                self.vectors.indptr[row_start:row_end + 1] - data_start
+            ),
+            shape=(row_end - row_start, self.vectors.shape[1]),
+            copy=False
+        )
+        return TaskRowIndex(vectors, self.row_tasks[row_start:row_end])
+    
+    def score_candidates(self, prompt_vectors, candidates: List[np.ndarray], n_tasks: int) -> np.ndarray:
+        """
+        Best cosine similarity per task over each prompt's own candidate rows
+        
+        The batch is scored in one product against the union of all candidate rows;
+        similarities to rows that are not among a prompt's candidates are masked out.
+        
+        Args:
+            prompt_vectors: (n_prompts, n_features) L2-normalized prompt vectors
+            candidates: Sorted row positions to score, one array per prompt
+            n_tasks: Total number of task positions
+            
+        Returns:
+            (n_prompts, n_tasks) scores; tasks without candidate rows get -inf
+        """
+        scores = np.full((len(candidates), n_tasks), -np.inf, dtype=self.vectors.dtype)
+        flat = np.concatenate(candidates) if candidates else np.empty(0, dtype=np.intp)
+        rows = np.unique(flat)
+        if not len(rows):
+            return scores
+        
+        similarities = dense_similarities(prompt_vectors @ self.vectors[rows].T)
+        prompt_ids = np.repeat(np.arange(len(candidates)), [len(rows_i) for rows_i in candidates])
+        columns = np.searchsorted(rows, flat)
+        masked = np.full(similarities.shape, -np.inf, dtype=similarities.dtype)
+        masked[prompt_ids, columns] = similarities[prompt_ids, columns]
+        
+        # The union is sorted, so tasks stay grouped and segments reduce like the full index
+        tasks = self.row_tasks[rows]
+        starts = np.flatnonzero(np.r_[True, tasks[1:] != tasks[:-1]])
+        scores[:, tasks[starts]] = np.maximum.reduceat(masked, starts, axis=1)
+        return scores
+
+class StageStats:
+    """Prompt counts and cumulative latency of one cascade stage"""
+    
     def __init__(self):
-        self.tasks = {task.task_id: task for task in TASKS}
-        self.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
+        self.prompts = 0
+        self.accepted = 0
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, prompts: int, accepted: int, seconds: float):
+        """Account one batch handled by the stage"""
+        with self._lock:
+            self.prompts += prompts
+            self.accepted += accepted
+            self.calls += 1
+            self.seconds += seconds
+    
+    def stats(self) -> Dict:
+        """Hit rate (share of prompts answered by this stage) and latencies"""
+        with self._lock:
+            return {
+                "prompts": self.prompts,
+                "accepted": self.accepted,
+                "hit_rate": self.accepted / self.prompts if self.prompts else 0.0,
+                "mean_batch_ms": self.seconds / self.calls * 1e3 if self.calls else 0.0,
+                "mean_prompt_ms": self.seconds / self.prompts * 1e3 if self.prompts else 0.0
+            }
+
+# "exhaustive" scores every training row; "centroid" scores a few prototypes per task
+SCORING_MODES = ("exhaustive", "centroid")
+
+# "tfidf" fits a vocabulary; "hashing" hashes features into a fixed space (no vocabulary);
+# "embedding" encodes text with a transformer sentence encoder (needs torch and transformers)
+BACKENDS = ("tfidf", "hashing", "embedding")
+
+class TaskMapper:
+    def __init__(self, artifact_dir: Optional[str] = DEFAULT_ARTIFACT_DIR,
+                 cache_size: int = 0, cache_ttl: Optional[float] = None,
+                 scoring_mode: str = "exhaustive", centroids_per_task: int = 1,
+                 backend: str = "tfidf", n_features: int = 2 ** 18,
+                 compact_every: int = 1000, ann_candidates: Optional[int] = None,
+                 ann_lists: Optional[int] = None, ann_components: int = 64,
+                 embedding_model: str = DEFAULT_EMBEDDING_MODEL, quantize_embeddings: bool = False,
+                 batch_max_size: int = 32, batch_max_wait_ms: float = 5.0,
+                 embedding_cache_dir: Optional[str] = None, embedding_cache_size: int = 100_000,
+                 cascade_backend: Optional[str] = None, cascade_margin: float = 0.1,
+                 cascade_min_score: float = 0.3, dtype: type = np.float32,
+                 tasks: Optional[List[Task]] = None, sample_prompts: Optional[List[Dict]] = None,
+                 max_prompt_chars: int = 4096, prompt_sketch_terms: int = 512,
+                 shards: int = 1, fast_path_size: int = 10_000, fast_path_min_count: int = 3,
+                 token_normalizer: Optional[str] = None, min_df: Union[int, float] = 1,
+                 max_df: Union[int, float] = 1.0, max_features: Optional[int] = None,
+                 chi2_features: Optional[int] = None):
+        """
+        Args:
+            artifact_dir: Directory for persisted model artifacts (None to always refit in memory)
+            cache_size: Maximum number of cached mapping results (0 disables the cache)
+            cache_ttl: Seconds a cached mapping result stays valid (None for no expiry)
+            scoring_mode: One of SCORING_MODES
+            centroids_per_task: Prototype vectors kept per task in centroid mode
+            backend: One of BACKENDS
+            n_features: Number of hashed feature columns for the hashing backend
+            compact_every: Examples added through add_examples before they are folded
+                into a full refit
+            ann_candidates: Candidate budget per prompt for approximate nearest-neighbor
+                scoring (None scores every row exactly)
+            ann_lists: Number of inverted lists in the ANN index (default: about sqrt(rows))
+            ann_components: Dimensionality the ANN index reduces TF-IDF rows to
+            embedding_model: Sentence encoder for the embedding backend
+            quantize_embeddings: Run the sentence encoder with int8 dynamic quantization
+            batch_max_size: Most prompts the embedding backend encodes in one micro-batch
+            batch_max_wait_ms: Longest a prompt waits for its micro-batch to fill
+            embedding_cache_dir: Directory of the persistent prompt-embedding cache
+                (None disables it)
+            embedding_cache_size: Most embeddings kept in the persistent cache
+            cascade_backend: Backend of a second-stage mapper that rescores ambiguous
+                prompts (None disables the cascade)
+            cascade_margin: Minimum top-1/top-2 score margin for a first-stage answer
+            cascade_min_score: Minimum top-1 score for a first-stage answer
+            dtype: Floating point type of stored rows, prompt vectors and scores
+                (np.float32 or np.float64)
+            tasks: Task definitions to map to (default: TASKS)
+            sample_prompts: Labeled training prompts (default: SAMPLE_PROMPTS)
+            max_prompt_chars: Prompts longer than this are streamed into a bounded term
+                sketch instead of being vectorized in full
+            prompt_sketch_terms: Features kept in the term sketch of a long prompt
+            shards: Row shards scored in parallel worker processes over shared memory
+                (1 scores in-process)
+            fast_path_size: Most canonical prompts answered from the exact-match table
+                without vectorization (0 disables it)
+            fast_path_min_count: Times a prompt must be seen before it is promoted
+                into the exact-match table
+            token_normalizer: "stem" or "lemma" to fold inflected forms ("deploying",
+                "deployment") into one feature with NLTK (None keeps tokens as written)
+            min_df: Drop features in fewer training texts than this (count, or share if float)
+            max_df: Drop features in more training texts than this (count, or share if float)
+            max_features: Keep only this many of the most frequent features (None for all)
+            chi2_features: Keep only this many features, ranked by chi-squared dependence
+                on the task labels (None for all)
+        """
+        if scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring_mode}")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if centroids_per_task < 1:
+            raise ValueError("centroids_per_task must be at least 1")
+        if compact_every < 1:
+            raise ValueError("compact_every must be at least 1")
+        if ann_candidates is not None and ann_candidates < 1:
+            raise ValueError("ann_candidates must be at least 1")
+        if cascade_backend is not None and cascade_backend not in BACKENDS:
+            raise ValueError(f"Unknown cascade backend: {cascade_backend}")
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        pruning = min_df != 1 or max_df != 1.0 or max_features is not None or chi2_features is not None
+        if pruning and backend != "tfidf":
+            raise ValueError("Vocabulary pruning needs the tfidf backend")
+        if chi2_features is not None and chi2_features < 1:
+            raise ValueError("chi2_features must be at least 1")
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported dtype: {np.dtype(dtype).name}")
+        
+        self.scoring_mode = scoring_mode
+        self.centroids_per_task = centroids_per_task
+        self.backend = backend
+        self.dtype = np.dtype(dtype).type
+        self.catalog = TaskCatalog(TASKS if tasks is None else tasks)
+        self.task_list = self.catalog.tasks
+        self.tasks = self.catalog.by_id
+        self.sample_prompts = list(SAMPLE_PROMPTS if sample_prompts is None else sample_prompts)
+        unknown = sorted({
+            task_id for prompt_data in self.sample_prompts for task_id in prompt_data["expected_tasks"]
+        } - set(self.tasks))
+        if unknown:
+            raise ValueError(f"Sample prompts reference unknown task IDs: {', '.join(unknown)}")
+        # Prompts are tokenized once; the vectorizer and keyword matcher share the result
+        normalizer = TokenNormalizer(token_normalizer) if token_normalizer is not None else None
+        self.prompt_analyzer = PromptAnalyzer(stop_words='english', ngram_range=(1, 2), normalizer=normalizer)
+        self.prompt_budget = PromptBudget(self.prompt_analyzer, max_chars=max_prompt_chars,
+                                          max_terms=prompt_sketch_terms)
+        self.intent_segmenter = IntentSegmenter(self.prompt_analyzer)
+        if backend == "hashing":
+            self.vectorizer = HashingTfidfVectorizer(self.prompt_analyzer, n_features=n_features, dtype=self.dtype)
+        elif backend == "embedding":
+            encoder = SentenceEncoder(embedding_model, quantize=quantize_embeddings)
+            if embedding_cache_dir is not None:
+                # Repeated prompts and warm restarts skip inference entirely
+                encoder = CachedEncoder(encoder, EmbeddingCache(
+                    embedding_cache_dir, encoder.dimension, max_entries=embedding_cache_size,
+                    config=encoder.get_params()
+                ))
+            self.vectorizer = EmbeddingVectorizer(
+                encoder, max_batch_size=batch_max_size, max_wait_ms=batch_max_wait_ms, dtype=self.dtype
+            )
+        else:
+            self.vectorizer = IncrementalTfidfVectorizer(
+                analyzer=self.prompt_analyzer, dtype=self.dtype, min_df=min_df, max_df=max_df,
+                max_features=max_features
+            )
+        self.chi2_features = chi2_features
         self.task_vectors = None
         self.task_descriptions = []
         self.task_ids = []
+        # Tasks are ordered by persona so each persona's rows form a contiguous partition
+        self.task_index = []
+        self.persona_task_ranges = {}
+        for persona in PersonaType:
+            task_ids = self.catalog.task_ids_by_persona(persona)
+            self.persona_task_ranges[persona] = (
+                (len(self.task_index), len(self.task_index) + len(task_ids)) if task_ids else (0, 0)
+            )
+            self.task_index.extend(task_ids)
+        self.task_positions = {task_id: i for i, task_id in enumerate(self.task_index)}
+        self.row_index = None
+        self.persona_indexes = {}
+        # Examples streamed in through add_examples: all of them, and the rows not yet
+        # compacted into row_index (scored from a small delta index, keyed by persona)
+        self.added_examples = []
+        self.compact_every = compact_every
+        self._pending_vectors = []
+        self._pending_tasks = []
+        self.delta_indexes = {}
+        self.ann_candidates = ann_candidates
+        self.ann_lists = ann_lists
+        self.ann_components = ann_components
+        self.ann_index = None
+        # Sharded scoring: the worker pool lives as long as the mapper, the scorer
+        # (the shared-memory copy of the rows) is rebuilt with every refit
+        self.shards = shards
+        self._shard_pool = None
+        self.sharded_scorer = None
+        # Column-major copies of the rows for streaming sessions, built on first use
+        self._session_indexes = None
+        self._update_lock = threading.RLock()
+        self._compaction_thread = None
+        # Serializes refits; unlike the update lock it is held for the whole fit
+        self._refit_lock = threading.Lock()
+        # Odd while a refit swaps the fitted state; scoring retries batches that overlap a swap
+        self._model_version = 0
+        self.artifact_dir = artifact_dir
+        self.fingerprint = None
+        self.cache = PromptCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.fast_path = FastPathTable(fast_path_size, min_count=fast_path_min_count) if fast_path_size > 0 else None
+        self.keyword_matcher = KeywordMatcher(TASK_KEYWORDS)
+        
+        # Cascade: this mapper answers confident prompts; the rest are escalated to a
+        # second mapper over the same tasks (typically the embedding backend)
+        self.second_stage = None
+        self.cascade_margin = cascade_margin
+        self.cascade_min_score = cascade_min_score
+        self.stage_stats = (StageStats(), StageStats())
+        if cascade_backend is not None:
+            self.second_stage = TaskMapper(
+                artifact_dir=artifact_dir, backend=cascade_backend, n_features=n_features,
+                compact_every=compact_every, embedding_model=embedding_model,
+                quantize_embeddings=quantize_embeddings, batch_max_size=batch_max_size,
+                batch_max_wait_ms=batch_max_wait_ms, embedding_cache_dir=embedding_cache_dir,
+                embedding_cache_size=embedding_cache_size, dtype=dtype,
+                fast_path_size=fast_path_size, fast_path_min_count=fast_path_min_count,
+                token_normalizer=token_normalizer, tasks=self.task_list, sample_prompts=self.sample_prompts
+            )
+        
         self._train_model()
     
     def _train_model(self):
-        """Train the task mapping model using task descriptions and sample prompts"""
+        """
+        Fit the model on task descriptions, sample prompts and added examples, and swap it in
+        
+        The fit runs on a snapshot of the added examples without holding the update
+        lock, so add_examples, sessions and scoring carry on meanwhile; the lock is
+        only taken to swap the fitted state in and to re-add examples that arrived
+        during the fit (which go to the new model's delta index).
+        """
+        with self._refit_lock:
+            with self._update_lock:
+                added_examples = list(self.added_examples)
+            fitted = self._fit_model(added_examples)
+            
+            with self._update_lock:
+                self._install_model(fitted, self.added_examples[len(added_examples):])
+            
+            if fitted["artifact_path"]:
+                save_artifact(fitted["artifact_path"], self.fingerprint, *self._export_artifact())
+            # Cached results belong to the previous model
+            if self.cache is not None:
+                self.cache.clear()
+            if self.fast_path is not None:
+                self._reseed_fast_path()
+    
+    def _fit_model(self, added_examples: List[Dict]) -> Dict:
+        """
+        Fit a model without touching the live one
+        
+        Args:
+            added_examples: Examples added at runtime to include in the fit
+            
+        Returns:
+            Dict with the fitted vectorizer, row indexes and related state for _install_model
+        """
         # Combine task descriptions with sample prompts for better training
         training_texts = []
         training_task_ids = []
         
         # Add task descriptions
-        for task in TASKS:
+        for task in self.task_list:
             training_texts.append(task.description)
             training_task_ids.append(task.task_id)
         
-        # Add sample prompts with their expected tasks
-        for prompt_data in SAMPLE_PROMPTS:
+        # Add sample prompts with their expected tasks, plus examples added at runtime
+        sample_prompts = self.sample_prompts + added_examples
+        for prompt_data in sample_prompts:
             for task_id in prompt_data["expected_tasks"]:
                 training_texts.append(prompt_data["text"])
                 training_task_ids.append(task_id)
         
-        self.task_descriptions = training_texts
-        self.task_ids = training_task_ids
-        self.task_vectors = self.vectorizer.fit_transform(training_texts)
+        # Precompute the training-row -> task index once so scoring can reduce
+        # per-task maxima without walking rows in Python
+        row_tasks = np.array([self.task_positions[task_id] for task_id in training_task_ids], dtype=np.intp)
+        order = np.argsort(row_tasks, kind="stable")
+        
+        # Reuse the persisted artifact when the training data is unchanged; refit otherwise.
+        # Examples added at runtime are not replayed on restart, so those refits are not persisted.
+        fingerprint = training_fingerprint(self.task_list, sample_prompts, self._model_config())
+        persist = self.artifact_dir and not added_examples
+        path = artifact_path(self.artifact_dir, fingerprint) if persist else None
+        artifact = load_artifact(path, fingerprint) if path else None
+        
+        # Scoring keeps using the live vectorizer until the swap
+        vectorizer = self._fresh_vectorizer()
+        if artifact is not None:
+            row_index, ann_index = self._restore_artifact(vectorizer, *artifact)
+        else:
+            vectors = vectorizer.fit_transform(training_texts)
+            if self.chi2_features is not None:
+                vectors = vectorizer.select_features(training_texts, vectors, training_task_ids,
+                                                     self.chi2_features)
+            vectors = compact_rows(vectors, self.dtype)
+            row_index = TaskRowIndex(vectors, row_tasks)
+            if self.scoring_mode == "centroid":
+                row_index = self._build_centroids(row_index)
+            ann_index = None
+            if self.ann_candidates is not None:
+                ann_index = IVFIndex.build(
+                    row_index.vectors, n_components=self.ann_components, n_lists=self.ann_lists
+                )
+        
+        sharded_scorer = None
+        if self.shards > 1 and ann_index is None:
+            if self._shard_pool is None:
+                self._shard_pool = create_pool(self.shards)
+            sharded_scorer = ShardedScorer(row_index, self.shards, self._shard_pool)
+        
+        return {
+            "fingerprint": fingerprint,
+            "vectorizer": vectorizer,
+            "row_index": row_index,
+            "ann_index": ann_index,
+            "persona_indexes": self._partition_by_persona(row_index),
+            "sharded_scorer": sharded_scorer,
+            # task_descriptions keeps the training texts
+            "task_descriptions": [training_texts[i] for i in order],
+            "artifact_path": path if artifact is None else None
+        }
+    
+    def _fresh_vectorizer(self):
+        """An unfitted vectorizer with the live one's configuration"""
+        if self.backend == "tfidf":
+            return IncrementalTfidfVectorizer(**self.vectorizer.get_params(deep=False))
+        if self.backend == "hashing":
+            return HashingTfidfVectorizer(self.prompt_analyzer, n_features=self.vectorizer.n_features, dtype=self.dtype)
+        # Embeddings have no fitted state (and the vectorizer owns the encoder)
+        return self.vectorizer
+    
+    def _install_model(self, fitted: Dict, added_examples: List[Dict]):
+        """
+        Swap a fitted model in; the caller holds the update lock
+        
+        Args:
+            fitted: Result of _fit_model
+            added_examples: Examples added since the fit's snapshot, kept as delta rows
+        """
+        vectorizer = fitted["vectorizer"]
+        pending_vectors = []
+        pending_tasks = []
+        texts = [example["text"] for example in added_examples for _ in example["expected_tasks"]]
+        if texts:
+            analyses = [self.prompt_analyzer.analyze(text) for text in texts]
+            vectorizer.partial_fit(analyses)
+            pending_vectors.append(compact_rows(vectorizer.transform(analyses), self.dtype))
+            pending_tasks.extend(
+                self.task_positions[task_id] for example in added_examples for task_id in example["expected_tasks"]
+            )
+        
+        self._model_version += 1
+        try:
+            self.fingerprint = fitted["fingerprint"]
+            self.vectorizer = vectorizer
+            self.row_index = fitted["row_index"]
+            self.ann_index = fitted["ann_index"]
+            self.persona_indexes = fitted["persona_indexes"]
+            self.sharded_scorer = fitted["sharded_scorer"]
+            self._pending_vectors = pending_vectors
+            self._pending_tasks = pending_tasks
+            self.delta_indexes = self._delta_indexes(pending_vectors, pending_tasks)
+            self._session_indexes = None
+        finally:
+            self._model_version += 1
+        
+        # task_ids is aligned with the rows of task_vectors (prototypes rather than
+        # examples in centroid mode)
+        self.task_descriptions = fitted["task_descriptions"]
+        self.task_ids = [self.task_index[i] for i in self.row_index.row_tasks]
+        self.task_vectors = self.row_index.vectors
+    
+    def _delta_indexes(self, pending_vectors: List, pending_tasks: List[int]) -> Dict:
+        """Row indexes over examples not yet compacted, per persona and for all tasks (None)"""
+        if not pending_tasks:
+            return {}
+        delta_index = TaskRowIndex(stack_rows(pending_vectors), np.array(pending_tasks, dtype=np.intp))
+        delta_indexes = self._partition_by_persona(delta_index)
+        delta_indexes[None] = delta_index
+        return delta_indexes
+    
+    def _reseed_fast_path(self):
+        """
+        Mark the exact-match table stale and re-score the sample prompts for the new model
+        
+        Promoted prompts are re-scored lazily (see _score_fast_path), so a refit costs
+        one small batch however many prompts the table holds.
+        """
+        self.fast_path.invalidate()
+        generation = self.fast_path.generation
+        seeds = list(dict.fromkeys(canonical_prompt(p["text"]) for p in self.sample_prompts))
+        if seeds:
+            self.fast_path.seed(seeds, self._score_vectors(seeds), generation)
+    
+    def _model_config(self) -> Dict:
+        """Configuration that, together with the training data, determines the fitted model"""
+        return {
+            "backend": self.backend,
+            "dtype": np.dtype(self.dtype).name,
+            "vectorizer": self.vectorizer.get_params(),
+            "scoring_mode": self.scoring_mode,
+            "centroids_per_task": self.centroids_per_task,
+            "chi2_features": self.chi2_features,
+            "ann": None if self.ann_candidates is None else {
+                "lists": self.ann_lists, "components": self.ann_components
+            }
+        }
+    
+    def _build_centroids(self, row_index: TaskRowIndex) -> TaskRowIndex:
+        """
+        Collapse each task's training rows into at most centroids_per_task prototypes
+        
+        A single prototype is the normalized mean of the task's rows; more than one
+        are k-means sub-centroids, which keep distinct phrasings of a task apart.
+        """
+        bounds = np.append(row_index.offsets, len(row_index.row_tasks))
+        centroids = []
+        centroid_tasks = []
+        
+        for start, end, task in zip(bounds[:-1], bounds[1:], row_index.segment_tasks):
+            rows = row_index.vectors[start:end]
+            n_clusters = min(self.centroids_per_task, end - start)
+            if n_clusters == 1:
+                centers = np.atleast_2d(np.asarray(rows.mean(axis=0)))
+            else:
+                kmeans = KMeans(n_clusters=n_clusters, n_init=3, random_state=0).fit(rows)
+                centers = kmeans.cluster_centers_
+            centers = normalize(centers)
+            centroids.append(sp.csr_matrix(centers) if sp.issparse(rows) else centers.astype(rows.dtype))
+            centroid_tasks.extend([task] * n_clusters)
+        
+        return TaskRowIndex(compact_rows(stack_rows(centroids), self.dtype), np.array(centroid_tasks, dtype=np.intp))
+    
+    def _partition_by_persona(self, row_index: TaskRowIndex) -> Dict[PersonaType, TaskRowIndex]:
+        """Partition a row index by persona; partitions share the index's buffers"""
+        return {
+            persona: row_index.task_slice(task_start, task_end)
+            for persona, (task_start, task_end) in self.persona_task_ranges.items()
+        }
+    
+    def _export_artifact(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Split the fitted model into memory-mappable arrays and JSON metadata"""
+        vectors = self.row_index.vectors
+        metadata = {"shape": list(vectors.shape)}
+        
+        # Embeddings are stored as one dense matrix; the encoder is loaded by name
+        if self.backend == "embedding":
+            arrays = {"vectors": vectors, "row_tasks": self.row_index.row_tasks}
+        else:
+            arrays = {
+                "data": vectors.data,
+                "indices": vectors.indices,
+                "indptr": vectors.indptr,
+                "row_tasks": self.row_index.row_tasks,
+                "doc_freq": self.vectorizer.doc_freq
+            }
+            metadata["n_docs"] = self.vectorizer.n_docs
+        
+        # The hashing backend has no vocabulary: document frequencies are its whole state
+        if self.backend == "tfidf":
+            metadata["terms"] = self.vectorizer.get_feature_names_out().tolist()
+        
+        if self.ann_index is not None:
+            arrays.update({f"ann_{name}": array for name, array in self.ann_index.to_arrays().items()})
+        
+        return arrays, metadata
+    
+    def _restore_artifact(self, vectorizer, arrays: Dict[str, np.ndarray],
+                          metadata: Dict) -> Tuple[TaskRowIndex, Optional[IVFIndex]]:
+        """Restore a vectorizer's fitted state and rebuild the task row index and ANN index from an artifact"""
+        if self.backend == "embedding":
+            vectors = arrays["vectors"]
+        else:
+            vectorizer.restore(np.asarray(arrays["doc_freq"]), metadata["n_docs"], metadata.get("terms"))
+            vectors = sp.csr_matrix(
+                (arrays["data"], arrays["indices"], arrays["indptr"]),
+                shape=tuple(metadata["shape"]),
+                copy=False
+            )
+        
+        ann_index = None
+        if self.ann_candidates is not None:
+            ann_index = IVFIndex.from_arrays(
+                {name[len("ann_"):]: array for name, array in arrays.items() if name.startswith("ann_")}
+            )
+        
+        return TaskRowIndex(vectors, arrays["row_tasks"]), ann_index
     
-    def map_prompt_to_tasks(self, prompt: str, threshold: float = 0.3) -> List[Tuple[str, float]]:
+    def map_prompt_to_tasks(self, prompt: str, threshold: float = 0.3,
+                            persona: Optional[PersonaType] = None,
+                            global_fallback: bool = False,
+                            top_k: Optional[int] = None,
+                            multi_intent: bool = False) -> List[Tuple[str, float]]:
         """
         Map a user prompt to relevant tasks with confidence scores
         
         Args:
             prompt: User input text
             threshold: Minimum confidence score for task matching
+            persona: Only score tasks owned by this persona (None for all tasks)
+            global_fallback: Score all tasks when nothing in the persona's partition matches
+            top_k: Return at most this many of the best tasks (None for all matches)
+            multi_intent: Also score each clause of the prompt and keep every task's best score
             
         Returns:
             List of (task_id, confidence_score) tuples
         """
-        # Vectorize the input prompt
-        prompt_vector = self.vectorizer.transform([prompt])
+        return self.map_prompts_to_tasks([prompt], threshold, top_k=top_k, persona=persona,
+                                         global_fallback=global_fallback, multi_intent=multi_intent)[0]
+    
+    def map_prompts_to_tasks(self, prompts: List[Union[str, PromptAnalysis]], threshold: float = 0.3,
+                             top_k: Optional[int] = None,
+                             persona: Optional[PersonaType] = None,
+                             global_fallback: bool = False,
+                             multi_intent: bool = False) -> List[List[Tuple[str, float]]]:
+        """
+        Map a batch of user prompts to relevant tasks in a single scoring pass
+        
+        Args:
+            prompts: User input texts, or PromptAnalysis results for already tokenized prompts
+            threshold: Minimum confidence score for task matching
+            top_k: Maximum number of tasks to return per prompt (None for all)
+            persona: Only score tasks owned by this persona (None for all tasks)
+            global_fallback: Score all tasks for prompts with no match in the persona's partition
+            multi_intent: Split prompts into clauses (e.g. "fix the prod bug and then draft
+                the proposal") and keep every task's best score over the whole prompt
+                and its clauses, so each intent can match on its own
+            
+        Returns:
+            One list of (task_id, confidence_score) tuples per prompt, in input order
+        """
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        if not prompts:
+            return []
+        
+        # Huge raw prompts are reduced to a bounded term sketch before any scoring
+        prompts = [
+            self.prompt_budget.analyze(prompt)[0]
+            if isinstance(prompt, str) and self.prompt_budget.applies(prompt) else prompt
+            for prompt in prompts
+        ]
+        results = self._map_batch(prompts, threshold, top_k, persona, multi_intent)
+        
+        if persona is not None and global_fallback:
+            # Cross-persona detection: rescore only the prompts the partition could not map
+            unmatched = [i for i, result in enumerate(results) if not result]
+            if unmatched:
+                fallback = self._map_batch([prompts[i] for i in unmatched], threshold, top_k, None, multi_intent)
+                for i, result in zip(unmatched, fallback):
+                    results[i] = result
+        
+        return results
+    
+    def _map_batch(self, prompts: List[Union[str, PromptAnalysis]], threshold: float, top_k: Optional[int],
+                   persona: Optional[PersonaType], multi_intent: bool = False) -> List[List[Tuple[str, float]]]:
+        """Score and select a batch against one partition, going through the result cache"""
+        score = self._score_intents if multi_intent else self._score_prompts
+        if self.cache is None:
+            return self._select_tasks(score(prompts, persona), threshold, top_k)
+        
+        # Serve retries from the cache and score only the misses, still as one batch.
+        # Budgeted prompts are not cached: their text is only the prompt's leading part.
+        keys = [
+            None if isinstance(prompt, PromptAnalysis) and prompt.term_counts is not None else (
+                normalize_prompt(prompt.text if isinstance(prompt, PromptAnalysis) else prompt),
+                threshold, top_k, persona, multi_intent
+            )
+            for prompt in prompts
+        ]
+        # Read before scoring: a retrain that clears the cache meanwhile makes the puts no-ops
+        generation = self.cache.generation
+        results = [self.cache.get(key) if key is not None else None for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        
+        if misses:
+            scores = score([prompts[i] for i in misses], persona)
+            for i, result in zip(misses, self._select_tasks(scores, threshold, top_k)):
+                results[i] = tuple(result)
+                if keys[i] is not None:
+                    self.cache.put(keys[i], results[i], generation)
+        
+        return [list(result) for result in results]
+    
+    def _score_prompts(self, prompts: List[Union[str, PromptAnalysis]], persona: Optional[PersonaType] = None) -> np.ndarray:
+        """Score a batch of prompts, returning a (prompts x tasks) matrix (-inf for tasks not scored)"""
+        start = time.perf_counter()
+        if self.fast_path is None:
+            scores = self._score_vectors(prompts, persona)
+        else:
+            scores = self._score_fast_path(prompts, persona)
+        
+        if self.second_stage is not None:
+            scores = self._cascade(prompts, scores, persona, time.perf_counter() - start)
+        
+        return scores
+    
+    def _score_intents(self, prompts: List[Union[str, PromptAnalysis]], persona: Optional[PersonaType] = None) -> np.ndarray:
+        """
+        Score prompts as the union of their clauses
+        
+        Every prompt and each of its clauses go into one batch, scored in a single
+        pass; per-task scores are then reduced to each prompt's maximum.
+        """
+        segments = []
+        owners = []
+        for i, prompt in enumerate(prompts):
+            segments.append(prompt)
+            owners.append(i)
+            # Budgeted prompts are only a term sketch; they are not segmented
+            if isinstance(prompt, PromptAnalysis) and prompt.term_counts is not None:
+                continue
+            clauses = self.intent_segmenter.split(prompt.text if isinstance(prompt, PromptAnalysis) else prompt)
+            if len(clauses) > 1:
+                segments.extend(clauses)
+                owners.extend([i] * len(clauses))
+        
+        if len(segments) == len(prompts):
+            return self._score_prompts(prompts, persona)
+        scores = self._score_prompts(segments, persona)
+        starts = np.flatnonzero(np.r_[True, np.diff(owners) != 0])
+        return np.maximum.reduceat(scores, starts, axis=0)
+    
+    def _score_fast_path(self, prompts: List[Union[str, PromptAnalysis]], persona: Optional[PersonaType]) -> np.ndarray:
+        """Take canonical prompts' scores from the exact-match table and score only the rest"""
+        # Budgeted prompts are not looked up: their text is only the prompt's leading part
+        keys = [
+            None if isinstance(prompt, PromptAnalysis) and prompt.term_counts is not None else
+            canonical_prompt(prompt.text if isinstance(prompt, PromptAnalysis) else prompt)
+            for prompt in prompts
+        ]
+        # Read before scoring, so rows scored against a model replaced meanwhile are refused
+        generation = self.fast_path.generation
+        rows = [self.fast_path.get(key) if key is not None else None for key in keys]
+        misses = [i for i, row in enumerate(rows) if row is None]
+        
+        if len(misses) == len(prompts):
+            scores = self._score_vectors(prompts, persona)
+        else:
+            scores = np.empty((len(prompts), len(self.task_index)), dtype=self.dtype)
+            hits = [i for i, row in enumerate(rows) if row is not None]
+            scores[hits] = np.vstack([rows[i] for i in hits])
+            if persona is not None:
+                # Rows hold global scores; a persona partition scores only its own tasks
+                task_start, task_end = self.persona_task_ranges[persona]
+                scores[hits, :task_start] = -np.inf
+                scores[hits, task_end:] = -np.inf
+            if misses:
+                scores[misses] = self._score_vectors([prompts[i] for i in misses], persona)
+        
+        missed_keys = [keys[i] for i in misses if keys[i] is not None]
+        if persona is None and missed_keys:
+            # Global scores of missed prompts are exactly their table rows: refresh stale ones for free
+            self.fast_path.refresh(missed_keys, scores[[i for i in misses if keys[i] is not None]], generation)
+        hot = self.fast_path.record_misses(missed_keys)
+        if hot:
+            self.fast_path.promote(hot, self._score_vectors(hot), generation)
+        return scores
+    
+    def _score_vectors(self, prompts: List[Union[str, PromptAnalysis]], persona: Optional[PersonaType] = None) -> np.ndarray:
+        """Vectorize and score a batch against the fitted rows and the delta index"""
+        # A background compaction swaps the vectorizer and row indexes while batches
+        # are being scored; a batch that overlapped the swap may have mixed the two
+        # models (or failed on mismatched shapes) and is scored again
+        while True:
+            version = self._model_version
+            if version % 2 == 0:
+                try:
+                    scores = self._score_batch(prompts, persona)
+                except Exception:
+                    if version == self._model_version:
+                        raise
+                else:
+                    if version == self._model_version:
+                        return scores
+            time.sleep(0)
+    
+    def _score_batch(self, prompts: List[Union[str, PromptAnalysis]], persona: Optional[PersonaType]) -> np.ndarray:
+        """One vectorize-and-score pass over the current fitted state"""
+        prompt_vectors = self._vectorize(prompts)
+        
+        if self.ann_index is not None:
+            scores = self._score_candidates(prompt_vectors, persona)
+        elif self.sharded_scorer is not None:
+            task_range = self.persona_task_ranges[persona] if persona is not None else None
+            scores = self.sharded_scorer.score(prompt_vectors, len(self.task_index), task_range)
+        else:
+            index = self.row_index if persona is None else self.persona_indexes[persona]
+            scores = index.score(prompt_vectors, len(self.task_index))
+        
+        # Rows added since the last compaction live in a small separate index
+        delta_index = self.delta_indexes.get(persona)
+        if delta_index is not None:
+            scores = np.maximum(scores, delta_index.score(prompt_vectors, len(self.task_index)))
+        
+        return scores
+    
+    def _vectorize(self, prompts: List[Union[str, PromptAnalysis]]):
+        """Vectorize a batch, using term counts for budgeted prompts"""
+        budgeted = [
+            i for i, prompt in enumerate(prompts)
+            if isinstance(prompt, PromptAnalysis) and prompt.term_counts is not None
+        ]
+        # Vectorize the whole batch at once; the analyzer reuses existing PromptAnalysis tokens.
+        # The embedding backend encodes text, so budgeted prompts go in as their leading part.
+        if not budgeted or self.backend == "embedding":
+            return self.vectorizer.transform(prompts)
+        
+        budgeted_set = set(budgeted)
+        plain = [i for i in range(len(prompts)) if i not in budgeted_set]
+        blocks = [self.vectorizer.transform_counts([prompts[i].term_counts for i in budgeted])]
+        if plain:
+            blocks.insert(0, self.vectorizer.transform([prompts[i] for i in plain]))
+        # Rows are stacked plain-first; restore the batch order
+        return stack_rows(blocks)[np.argsort(plain + budgeted)]
+    
+    def _cascade(self, prompts: List[Union[str, PromptAnalysis]], scores: np.ndarray,
+                 persona: Optional[PersonaType], first_stage_seconds: float) -> np.ndarray:
+        """
+        Replace the scores of ambiguous prompts with the second stage's scores
+        
+        A first-stage answer stands when its best score reaches cascade_min_score and
+        leads the runner-up by at least cascade_margin; everything else is escalated.
+        """
+        if scores.shape[1] > 1:
+            top_two = -np.partition(-scores, 1, axis=1)[:, :2]
+            top1, top2 = top_two[:, 0], top_two[:, 1]
+        else:
+            top1, top2 = scores[:, 0], np.full(len(scores), -np.inf)
+        confident = (top1 >= self.cascade_min_score) & (top1 - top2 >= self.cascade_margin)
+        escalated = np.flatnonzero(~confident)
+        self.stage_stats[0].record(len(scores), len(scores) - len(escalated), first_stage_seconds)
+        
+        if len(escalated):
+            start = time.perf_counter()
+            scores[escalated] = self.second_stage._score_prompts([prompts[i] for i in escalated], persona)
+            self.stage_stats[1].record(len(escalated), len(escalated), time.perf_counter() - start)
+        
+        return scores
+    
+    def _select_tasks(self, scores: np.ndarray, threshold: float,
+                      top_k: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """Apply the threshold and descending sort to per-task scores in vectorized form"""
+        if top_k is not None and top_k < scores.shape[1]:
+            # Find each row's k-th best score in linear time, then keep everything above it
+            # plus the earliest ties, so results match a full stable sort exactly
+            kth = -np.partition(-scores, top_k - 1, axis=1)[:, top_k - 1:top_k]
+            above = scores > kth
+            ties = scores == kth
+            keep = above | (ties & (np.cumsum(ties, axis=1) <= top_k - above.sum(axis=1, keepdims=True)))
+            candidates = np.nonzero(keep)[1].reshape(len(scores), top_k)
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.take_along_axis(candidates, np.argsort(-candidate_scores, axis=1, kind="stable"), axis=1)
+        else:
+            order = np.argsort(-scores, axis=1, kind="stable")
+        sorted_scores = np.take_along_axis(scores, order, axis=1)
+        match_counts = (sorted_scores >= threshold).sum(axis=1)
+        
+        # Python-level work is limited to the tasks that actually matched
+        return [
+            [(self.task_index[j], score) for j, score in zip(row_order[:count].tolist(), row_scores[:count].tolist())]
+            for row_order, row_scores, count in zip(order, sorted_scores, match_counts)
+        ]
+    
+    def _score_candidates(self, prompt_vectors, persona: Optional[PersonaType] = None) -> np.ndarray:
+        """Score each prompt exactly against only the ANN index's candidate rows, as one batch"""
+        n_tasks = len(self.task_index)
+        candidates = self.ann_index.candidates(prompt_vectors, self.ann_candidates)
+        scores = self.row_index.score_candidates(prompt_vectors, candidates, n_tasks)
+        if persona is not None:
+            # Rows only score their own task, so dropping other personas' tasks drops their rows
+            task_start, task_end = self.persona_task_ranges[persona]
+            scores[:, :task_start] = -np.inf
+            scores[:, task_end:] = -np.inf
+        return scores
+    
+    def add_examples(self, texts: List[str], task_ids: List[str]) -> Dict:
+        """
+        Add labeled prompts to the live model without a full refit
+        
+        Document frequencies are updated incrementally and the new rows are scored
+        from a delta index right away. Once compact_every examples are pending, a
+        background thread folds them into a full refit (which also picks up new
+        vocabulary terms); the delta index keeps serving them until it finishes.
+        
+        Until then scores drift slightly: partial_fit updates the idf applied to
+        prompts, while the fitted rows keep the idf they were weighted with at fit
+        time (and delta rows the idf at the time they were added). Affected terms
+        are the ones whose document frequency changed, and only by the ratio of the
+        old and new idf; compaction re-weights every row with the current idf.
+        
+        Args:
+            texts: Prompt texts
+            task_ids: Expected task ID of each prompt
+            
+        Returns:
+            Dict with the number of examples added, pending rows and whether a
+            compaction is running
+        """
+        if len(texts) != len(task_ids):
+            raise ValueError("texts and task_ids must have the same length")
+        unknown = sorted({task_id for task_id in task_ids if task_id not in self.catalog})
+        if unknown:
+            raise ValueError(f"Unknown task IDs: {', '.join(unknown)}")
+        
+        with self._update_lock:
+            analyses = [self.prompt_analyzer.analyze(text) for text in texts]
+            self.vectorizer.partial_fit(analyses)
+            self._pending_vectors.append(compact_rows(self.vectorizer.transform(analyses), self.dtype))
+            
+            self._pending_tasks.extend(self.task_positions[task_id] for task_id in task_ids)
+            self.added_examples.extend(
+                {"text": text, "expected_tasks": [task_id]} for text, task_id in zip(texts, task_ids)
+            )
+            
+            self.delta_indexes = self._delta_indexes(self._pending_vectors, self._pending_tasks)
+            self._session_indexes = None
+            if self.fast_path is not None:
+                # O(1): stale rows are re-scored lazily instead of all at once here
+                self.fast_path.invalidate()
+            
+            if len(self._pending_tasks) >= self.compact_every:
+                self._start_compaction()
+            
+            if self.second_stage is not None:
+                self.second_stage.add_examples(texts, task_ids)
+            # Cleared once both stages have the new examples, so cached answers never mix them
+            if self.cache is not None:
+                self.cache.clear()
+            
+            return {
+                "added": len(texts),
+                "pending": len(self._pending_tasks),
+                "compacting": self.compacting
+            }
+    
+    @property
+    def compacting(self) -> bool:
+        """Whether a background compaction is running"""
+        thread = self._compaction_thread
+        return thread is not None and thread.is_alive()
+    
+    def _start_compaction(self):
+        """Refit in a background thread, unless one is already running"""
+        if self.compacting:
+            return
+        
+        def run():
+            # Another refit may have folded the examples in already
+            if self._pending_tasks:
+                self._train_model()
+        
+        self._compaction_thread = threading.Thread(target=run, name="mapper-compaction", daemon=True)
+        self._compaction_thread.start()
+    
+    def compact(self):
+        """Fold all added examples into a full refit of the model"""
+        self._train_model()
+        if self.second_stage is not None:
+            self.second_stage.compact()
+    
+    def session(self, threshold: float = 0.3, persona: Optional[PersonaType] = None,
+                global_fallback: bool = False, top_k: Optional[int] = None) -> MappingSession:
+        """
+        Open an incremental mapping session for a prompt that arrives in fragments
+        
+        Args:
+            threshold: Minimum confidence score for task matching
+            persona: Only report tasks owned by this persona (None for all tasks)
+            global_fallback: Report all tasks while nothing in the persona's partition matches
+            top_k: Report at most this many of the best tasks (None for all matches)
+            
+        Returns:
+            MappingSession; feed() it fragments, read top_tasks() at any point and
+            finish() with the last fragment
+        """
+        if self.backend == "embedding":
+            raise ValueError("Streaming sessions need a sparse (tfidf or hashing) backend")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        
+        with self._update_lock:
+            if self._session_indexes is None:
+                row_indexes = [self.row_index]
+                if None in self.delta_indexes:
+                    row_indexes.append(self.delta_indexes[None])
+                self._session_indexes = [SessionIndex(index, index.vectors.tocsc()) for index in row_indexes]
+            return MappingSession(
+                self, self._session_indexes, self.vectorizer.idf_, threshold=threshold,
+                persona=persona, global_fallback=global_fallback, top_k=top_k
+            )
+    
+    def close(self):
+        """
+        Release the mapper's background resources: sharded-scoring workers and their
+        shared memory, the embedding micro-batcher thread and embedding cache, and
+        the second stage
+        """
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        with self._update_lock:
+            close_vectorizer = getattr(self.vectorizer, "close", None)
+            if close_vectorizer is not None:
+                close_vectorizer()
+            if self.sharded_scorer is not None:
+                self.sharded_scorer.close()
+                self.sharded_scorer = None
+            if self._shard_pool is not None:
+                self._shard_pool.shutdown()
+                self._shard_pool = None
+            if self.second_stage is not None:
+                self.second_stage.close()
+    
+    def analyze(self, prompt: str, threshold: float = 0.3,
+                persona: Optional[PersonaType] = None,
+                global_fallback: bool = False,
+                top_k: Optional[int] = None,
+                multi_intent: bool = False) -> Dict:
+        """
+        Map a prompt to tasks and find its task keywords from a single tokenization
+        
+        Args:
+            prompt: User input text
+            threshold: Minimum confidence score for task matching
+            persona: Only score tasks owned by this persona (None for all tasks)
+            global_fallback: Score all tasks when nothing in the persona's partition matches
+            top_k: Return at most this many of the best tasks (None for all matches)
+            multi_intent: Also score each clause of the prompt and keep every task's best score
+            
+        Returns:
+            Dict with "mapped_tasks" (list of (task_id, confidence_score)), "keywords",
+            and "truncated" / "sketched" flags for prompts over the size budget
+        """
+        if self.prompt_budget.applies(prompt):
+            # Stream huge prompts: one pass yields both the term sketch and the keywords
+            analysis, keywords = self.prompt_budget.analyze(prompt, self.keyword_matcher)
+        else:
+            analysis = self.prompt_analyzer.analyze(prompt)
+            keywords = self.keyword_matcher.match_tokens(analysis.tokens)
+        mapped_tasks = self.map_prompts_to_tasks([analysis], threshold, top_k=top_k, persona=persona,
+                                                 global_fallback=global_fallback, multi_intent=multi_intent)[0]
         
-        # Calculate similarity with all task descriptions
-        similarities = cosine_similarity(prompt_vector, self.task_vectors).flatten()
+        budgeted = analysis.term_counts is not None
+        return {
+            "mapped_tasks": mapped_tasks,
+            "keywords": keywords,
+            # Text-encoding backends only see the leading max_prompt_chars of a budgeted prompt
+            "truncated": analysis.truncated or (budgeted and self.backend == "embedding"),
+            "sketched": analysis.sketched
+        }
+    
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters of the mapping result cache"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def fast_path_stats(self) -> Dict:
+        """Hit/miss counters of the exact-match table"""
+        if self.fast_path is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.fast_path.stats()}
+    
+    def cascade_stats(self) -> Dict:
+        """Per-stage hit rates and latencies of the cascade"""
+        if self.second_stage is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "margin": self.cascade_margin,
+            "min_score": self.cascade_min_score,
+            "first_stage": {"backend": self.backend, **self.stage_stats[0].stats()},
+            "second_stage": {"backend": self.second_stage.backend, **self.stage_stats[1].stats()}
+        }
+    
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Bytes held by each component of the fitted model
         
-        # Get tasks above threshold
-        matched_tasks = []
-        for i, similarity in enumerate(similarities):
-            if similarity >= threshold:
-                task_id = self.task_ids[i]
-                matched_tasks.append((task_id, similarity))
+        Arrays memory-mapped from a persisted artifact are counted at full size in
+        their component and again under "memory_mapped": those pages live in the OS
+        page cache and are shared by every worker mapping the same artifact.
+        """
+        vectors = self.row_index.vectors
+        report = {}
+        if sp.issparse(vectors):
+            report["row_data"] = vectors.data.nbytes
+            report["row_indices"] = vectors.indices.nbytes
+            report["row_indptr"] = vectors.indptr.nbytes
+        else:
+            report["row_vectors"] = vectors.nbytes
+        report["row_tasks"] = nbytes(self.row_index.row_tasks, self.row_index.offsets, self.row_index.segment_tasks)
         
-        # Remove duplicates and sort by confidence
-        unique_tasks = {}
-        for task_id, score in matched_tasks:
-            if task_id not in unique_tasks or score > unique_tasks[task_id]:
-                unique_tasks[task_id] = score
+        # Persona partitions view the row buffers; only their index arrays are their own
+        report["persona_partitions"] = sum(
+            nbytes(index.offsets, index.segment_tasks) + (index.vectors.indptr.nbytes if sp.issparse(index.vectors) else 0)
+            for index in self.persona_indexes.values()
+        )
+        report["delta_rows"] = nbytes(*self._pending_vectors)
+        report["doc_freq"] = nbytes(getattr(self.vectorizer, "doc_freq", None))
+        report["idf"] = nbytes(self.vectorizer.idf_) if hasattr(self.vectorizer, "idf_") else 0
         
-        # Sort by confidence score (descending)
-        result = [(task_id, score) for task_id, score in unique_tasks.items()]
-        result.sort(key=lambda x: x[1], reverse=True)
+        vocabulary = getattr(self.vectorizer, "vocabulary_", None) or {}
+        report["vocabulary"] = sys.getsizeof(vocabulary) + sum(
+            sys.getsizeof(term) + sys.getsizeof(column) for term, column in vocabulary.items()
+        ) if vocabulary else 0
+        report["ann_index"] = nbytes(*self.ann_index.to_arrays().values()) if self.ann_index is not None else 0
+        report["session_columns"] = sum(
+            nbytes(index.columns.data, index.columns.indices, index.columns.indptr)
+            for index in self._session_indexes or []
+        )
+        report["shared_memory"] = self.sharded_scorer.nbytes if self.sharded_scorer is not None else 0
         
-        return result
+        report["total"] = sum(report.values())
+        mapped = [vectors.data, vectors.indices, vectors.indptr] if sp.issparse(vectors) else [vectors]
+        report["memory_mapped"] = sum(array.nbytes for array in mapped if is_memory_mapped(array))
+        return report
+    
+    def embedding_cache_stats(self) -> Dict:
+        """Hit/miss counters of the persistent embedding cache (of either cascade stage)"""
+        for mapper in (self, self.second_stage):
+            encoder = getattr(getattr(mapper, "vectorizer", None), "encoder", None)
+            if isinstance(encoder, CachedEncoder):
+                return {"enabled": True, **encoder.cache.stats()}
+        return {"enabled": False}
     
     def get_task_by_id(self, task_id: str) -> Task:
         """Get task object by ID"""
-        return self.tasks.get(task_id)
+        return self.catalog.get(task_id)
     
-    def get_tasks_by_persona(self, persona: PersonaType) -> List[Task]:
+    def get_tasks_by_persona(self, persona: PersonaType) -> Tuple[Task, ...]:
         """Get all tasks associated with a persona"""
-        return [task for task in TASKS if task.persona == persona]
+        return self.catalog.by_persona(persona)
     
     def analyze_prompt_keywords(self, prompt: str) -> Dict[str, List[str]]:
         """
         Analyze prompt for specific keywords that indicate task types
         """
-        prompt_lower = prompt.lower()
-        
-        keyword_mapping = {
-            TaskType.FEATURE_DEVELOPMENT: [
-                'implement', 'develop', 'create', 'build', 'add', 'new feature',
-                'enhancement', 'functionality', 'code', 'application'
-            ],
-            TaskType.PRODUCTION_SUPPORT: [
-                'production', 'server down', 'error', 'bug', 'hotfix', 'debug',
-                'issue', 'problem', 'fix', 'logs', 'crash'
-            ],
-            TaskType.INCIDENT_RESOLUTION: [
-                'ticket', 'incident', 'troubleshoot', 'investigate', 'resolve',
-                'network', 'connectivity', 'outage', 'itsm'
-            ],
-            TaskType.INFRASTRUCTURE_MAINTENANCE: [
-                'maintenance', 'script', 'configuration', 'server', 'infrastructure',
-                'update', 'patch', 'system'
-            ],
-            TaskType.LEAD_GENERATION: [
-                'lead', 'prospect', 'research', 'campaign', 'outbound',
-                'client', 'customer', 'sales'
-            ],
-            TaskType.PROPOSAL_DEVELOPMENT: [
-                'proposal', 'collateral', 'presentation', 'meeting',
-                'client', 'pitch', 'document'
-            ]
-        }
-        
-        found_keywords = {}
-        for task_type, keywords in keyword_mapping.items():
-            matches = [kw for kw in keywords if kw in prompt_lower]
-            if matches:
-                found_keywords[task_type.value] = matches
-        
-        return found_keywords
+        return self.keyword_matcher.match(prompt)
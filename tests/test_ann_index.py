@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from data import SAMPLE_PROMPTS
+from models import PersonaType
+from task_mapper import TaskMapper
+
+PERSONAS = [None] + list(PersonaType)
+PROMPTS = [p["text"] for p in SAMPLE_PROMPTS] + ["rotate the edge proxy certificates", "qzxv"]
+
+@pytest.fixture(scope="module")
+def mappers():
+    # A budget above the row count probes every list, so ANN scoring must equal exact scoring
+    ann = TaskMapper(artifact_dir=None, fast_path_size=0, ann_candidates=10**6)
+    exact = TaskMapper(artifact_dir=None, fast_path_size=0)
+    yield ann, exact
+    ann.close()
+    exact.close()
+
+@pytest.mark.parametrize("persona", PERSONAS, ids=lambda persona: getattr(persona, "value", "all"))
+def test_full_budget_matches_exact_scoring(mappers, persona):
+    ann, exact = mappers
+    actual = ann.map_prompts_to_tasks(PROMPTS, 0.0, top_k=3, persona=persona)
+    expected = exact.map_prompts_to_tasks(PROMPTS, 0.0, top_k=3, persona=persona)
+    assert [[task_id for task_id, _ in mapped] for mapped in actual] == \
+        [[task_id for task_id, _ in mapped] for mapped in expected]
+    for mapped, reference in zip(actual, expected):
+        assert [score for _, score in mapped] == pytest.approx([score for _, score in reference], abs=1e-6)
+
+def test_candidates_are_masked_per_prompt(mappers):
+    ann, _ = mappers
+    vectors = ann._vectorize(PROMPTS[:2])
+    n_tasks = len(ann.task_index)
+    # The second prompt's candidates must not leak into the first prompt's scores
+    candidates = [np.empty(0, dtype=np.int64), ann.ann_index.candidates(vectors[1], 10**6)[0]]
+    scores = ann.row_index.score_candidates(vectors, candidates, n_tasks)
+    assert (scores[0] == -np.inf).all()
+    assert (scores[1] > -np.inf).any()
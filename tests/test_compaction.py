@@ -0,0 +1,50 @@
+import threading
+from data import SAMPLE_PROMPTS
+from task_mapper import TaskMapper
+
+PROMPTS = [p["text"] for p in SAMPLE_PROMPTS] + ["rotate the edge proxy certificates"]
+
+def test_examples_added_during_a_refit_are_kept():
+    mapper = TaskMapper(artifact_dir=None, fast_path_size=0)
+    fit_model = mapper._fit_model
+    
+    def fit_then_add(added_examples):
+        # Runs without the update lock: add_examples must not wait for the fit
+        fitted = fit_model(added_examples)
+        adder = threading.Thread(
+            target=mapper.add_examples, args=(["rotate the edge proxy certificates"], ["infra_maint_001"])
+        )
+        adder.start()
+        adder.join(timeout=5)
+        assert not adder.is_alive()
+        return fitted
+    
+    mapper.add_examples(["patch the staging servers"], ["infra_maint_001"])
+    mapper._fit_model = fit_then_add
+    mapper.compact()
+    del mapper._fit_model
+    
+    assert len(mapper._pending_tasks) == 1
+    assert len(mapper.added_examples) == 2
+    
+    reference = TaskMapper(artifact_dir=None, fast_path_size=0)
+    reference.add_examples(["patch the staging servers", "rotate the edge proxy certificates"],
+                           ["infra_maint_001", "infra_maint_001"])
+    reference.compact()
+    mapper.compact()
+    
+    assert mapper.map_prompts_to_tasks(PROMPTS, 0.0) == reference.map_prompts_to_tasks(PROMPTS, 0.0)
+    mapper.close()
+    reference.close()
+
+def test_background_compaction_folds_examples_in():
+    mapper = TaskMapper(artifact_dir=None, fast_path_size=0, compact_every=2)
+    
+    result = mapper.add_examples(["patch the staging servers", "rotate the edge proxy certificates"],
+                                 ["infra_maint_001", "infra_maint_001"])
+    mapper._compaction_thread.join()
+    
+    assert result["pending"] == 2
+    assert mapper._pending_tasks == [] and mapper.delta_indexes == {}
+    assert mapper.map_prompt_to_tasks("rotate the edge proxy certificates", 0.5)[0][0] == "infra_maint_001"
+    mapper.close()
@@ -0,0 +1,73 @@
+import numpy as np
+from embedding_cache import EmbeddingCache, prompt_key
+
+DIM = 4
+
+def unit_vectors(count: int) -> np.ndarray:
+    vectors = np.arange(1, count * DIM + 1, dtype=np.float32).reshape(count, DIM)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_hits_return_stored_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    keys = [prompt_key(text) for text in ("deploy the api", "rotate the keys")]
+    vectors = unit_vectors(2)
+    cache.put_many(keys, vectors)
+    
+    hits = cache.get_many(keys)
+    
+    assert all(hit is not None for hit in hits)
+    np.testing.assert_allclose(np.vstack(hits), vectors, atol=1e-3)
+    cache.close()
+
+def test_corrupted_slot_is_never_returned(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    good, bad = prompt_key("deploy the api"), prompt_key("rotate the keys")
+    cache.put_many([good, bad], unit_vectors(2))
+    # Overwrite the slot behind the cache's back (e.g. a torn write or another writer)
+    cache._vectors[cache._entries[bad]] = 0.5
+    
+    hits = cache.get_many([good, bad, bad])
+    
+    assert hits[0] is not None
+    assert hits[1] is None and hits[2] is None
+    assert cache.stats()["corrupted"] == 1
+    cache.close()
+
+def test_corrupted_slot_is_dropped_on_reopen(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    key = prompt_key("deploy the api")
+    cache.put_many([key], unit_vectors(1))
+    cache._vectors[cache._entries[key]] = 0.5
+    cache.close()
+    
+    reopened = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    
+    assert reopened.get_many([key]) == [None]
+    reopened.close()
+
+def test_second_instance_gets_its_own_directory(tmp_path):
+    first = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    second = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    key = prompt_key("deploy the api")
+    vectors = unit_vectors(2)
+    
+    first.put_many([key], vectors[:1])
+    second.put_many([key], vectors[1:])
+    
+    assert first.directory != second.directory
+    np.testing.assert_allclose(first.get_many([key])[0], vectors[0], atol=1e-3)
+    np.testing.assert_allclose(second.get_many([key])[0], vectors[1], atol=1e-3)
+    first.close()
+    second.close()
+
+def test_directory_is_reused_after_close(tmp_path):
+    first = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    key = prompt_key("deploy the api")
+    first.put_many([key], unit_vectors(1))
+    first.close()
+    
+    second = EmbeddingCache(str(tmp_path), DIM, max_entries=8)
+    
+    assert second.directory == first.directory
+    assert second.get_many([key])[0] is not None
+    second.close()
@@ -0,0 +1,83 @@
+import pytest
+from data import SAMPLE_PROMPTS
+from models import PersonaType
+from task_mapper import TaskMapper
+
+PERSONAS = [None] + list(PersonaType)
+
+@pytest.fixture(scope="module")
+def mappers():
+    fast = TaskMapper(artifact_dir=None)
+    exact = TaskMapper(artifact_dir=None, fast_path_size=0)
+    yield fast, exact
+    fast.close()
+    exact.close()
+
+def assert_same_results(actual, expected):
+    assert [[task_id for task_id, _ in mapped] for mapped in actual] == \
+        [[task_id for task_id, _ in mapped] for mapped in expected]
+    for mapped, reference in zip(actual, expected):
+        assert [score for _, score in mapped] == pytest.approx([score for _, score in reference], abs=1e-6)
+
+@pytest.mark.parametrize("persona", PERSONAS, ids=lambda persona: getattr(persona, "value", "all"))
+def test_seeded_hits_match_normal_scoring(mappers, persona):
+    fast, exact = mappers
+    # Case and spacing variants map to the same canonical prompt
+    prompts = [p["text"] for p in SAMPLE_PROMPTS] + ["  " + p["text"].upper() for p in SAMPLE_PROMPTS]
+    hits = fast.fast_path.hits
+    
+    for global_fallback in (False, True):
+        actual = fast.map_prompts_to_tasks(prompts, 0.0, top_k=3, persona=persona, global_fallback=global_fallback)
+        expected = exact.map_prompts_to_tasks(prompts, 0.0, top_k=3, persona=persona, global_fallback=global_fallback)
+        assert_same_results(actual, expected)
+    assert fast.fast_path.hits - hits >= len(prompts)
+
+def test_promoted_hits_match_normal_scoring(mappers):
+    fast, exact = mappers
+    prompt = "please rebuild the staging cluster and rerun the failing deployment"
+    expected = {persona: exact.map_prompts_to_tasks([prompt], 0.0, persona=persona) for persona in PERSONAS}
+    
+    # Enough misses for a promotion round; the prompt is the hottest one
+    for _ in range(fast.fast_path.promote_every):
+        fast.map_prompt_to_tasks(prompt)
+    assert fast.fast_path.promotions >= 1
+    
+    hits = fast.fast_path.hits
+    for persona in PERSONAS:
+        assert_same_results(fast.map_prompts_to_tasks([prompt], 0.0, persona=persona), expected[persona])
+    assert fast.fast_path.hits - hits == len(PERSONAS)
+
+def test_promotion_round_is_capped():
+    mapper = TaskMapper(artifact_dir=None, fast_path_min_count=1)
+    table = mapper.fast_path
+    prompts = [f"rotate certificate batch {i}" for i in range(table.promote_every)]
+    promotions = table.promotions
+    
+    mapper.map_prompts_to_tasks(prompts)
+    
+    assert table.promotions - promotions == table.max_promotions
+    mapper.close()
+
+def test_updates_invalidate_rows_without_rescoring():
+    fast = TaskMapper(artifact_dir=None, fast_path_min_count=1)
+    exact = TaskMapper(artifact_dir=None, fast_path_size=0)
+    table = fast.fast_path
+    prompts = [f"rotate certificate batch {i}" for i in range(100)]
+    table.promote(prompts, fast._score_vectors(prompts), table.generation)
+    promotions = table.promotions
+    examples = ["rotate certificate batch 7 on the proxy"] * 2
+    
+    for mapper in (fast, exact):
+        mapper.add_examples(examples, ["infra_maint_001", "incident_res_001"])
+    
+    assert table.stats()["current"] == 0
+    hits = table.hits
+    for persona in PERSONAS:
+        assert_same_results(fast.map_prompts_to_tasks(prompts, 0.0, persona=persona),
+                            exact.map_prompts_to_tasks(prompts, 0.0, persona=persona))
+    assert table.hits - hits == len(prompts) * (len(PERSONAS) - 1)
+    # The global pass re-scored the stale rows in place; that is not a promotion
+    assert table.stats()["current"] == len(prompts)
+    assert table.promotions == promotions
+    fast.close()
+    exact.close()
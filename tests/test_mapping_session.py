@@ -0,0 +1,67 @@
+import pytest
+from models import PersonaType
+from task_mapper import TaskMapper
+
+PROMPTS = [
+    "fix the production bug and then draft the client proposal",
+    "Run the maintenance scripts on the servers!",
+    "deploy deploying deployment of kubernetes",
+    "review\tquarterly,budget/numbers for the finance team",
+    "",
+]
+
+@pytest.fixture(scope="module", params=["tfidf", "hashing"])
+def mapper(request):
+    mapper = TaskMapper(artifact_dir=None, backend=request.param, fast_path_size=0)
+    yield mapper
+    mapper.close()
+
+def fragments(text: str, size: int):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+def assert_same_results(actual, expected):
+    assert [task_id for task_id, _ in actual] == [task_id for task_id, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_fragmented_feed_matches_whole_prompt(mapper, prompt, size):
+    session = mapper.session(threshold=0.0)
+    for fragment in fragments(prompt, size):
+        session.feed(fragment)
+    
+    assert_same_results(session.finish(), mapper.map_prompt_to_tasks(prompt, threshold=0.0))
+    assert session.text == prompt
+
+@pytest.mark.parametrize("persona", list(PersonaType), ids=lambda persona: persona.value)
+@pytest.mark.parametrize("global_fallback", [False, True])
+def test_persona_and_top_k_match(mapper, persona, global_fallback):
+    for prompt in PROMPTS:
+        session = mapper.session(threshold=0.1, persona=persona, global_fallback=global_fallback, top_k=2)
+        for fragment in fragments(prompt, 4):
+            session.feed(fragment)
+        expected = mapper.map_prompt_to_tasks(
+            prompt, threshold=0.1, persona=persona, global_fallback=global_fallback, top_k=2
+        )
+        assert_same_results(session.finish(), expected)
+
+def test_partial_word_is_held_back(mapper):
+    session = mapper.session(threshold=0.0)
+    session.feed("deploy the kube")
+    partial = session.stats()["features"]
+    session.feed("rnetes cluster")
+    
+    assert_same_results(session.finish(), mapper.map_prompt_to_tasks("deploy the kubernetes cluster", threshold=0.0))
+    assert session.stats()["features"] > partial
+
+def test_added_examples_are_scored():
+    mapper = TaskMapper(artifact_dir=None, fast_path_size=0, compact_every=1000)
+    mapper.add_examples(["rotate the edge proxy certificates"], ["infra_maint_001"])
+    prompt = "please rotate the edge proxy certificates today"
+    
+    session = mapper.session(threshold=0.0, top_k=3)
+    for fragment in fragments(prompt, 5):
+        session.feed(fragment)
+    
+    assert_same_results(session.finish(), mapper.map_prompt_to_tasks(prompt, threshold=0.0, top_k=3))
+    mapper.close()
@@ -0,0 +1,33 @@
+from prompt_cache import PromptCache
+from task_mapper import TaskMapper
+
+def test_put_after_clear_is_dropped():
+    cache = PromptCache(max_size=8)
+    generation = cache.generation
+    cache.clear()
+    
+    cache.put("prompt", ("stale",), generation)
+    cache.put("other", ("fresh",), cache.generation)
+    
+    assert cache.get("prompt") is None
+    assert cache.get("other") == ("fresh",)
+
+def test_batch_scored_before_a_retrain_is_not_cached():
+    mapper = TaskMapper(artifact_dir=None, cache_size=64, fast_path_size=0)
+    prompt = "rotate the edge proxy certificates"
+    score_prompts = mapper._score_prompts
+    
+    def score_then_retrain(prompts, persona=None):
+        # The model changes after this batch was scored but before its results are cached
+        scores = score_prompts(prompts, persona)
+        mapper.__dict__.pop("_score_prompts")
+        mapper.add_examples([prompt], ["infra_maint_001"])
+        mapper.compact()
+        return scores
+    
+    mapper._score_prompts = score_then_retrain
+    stale = mapper.map_prompt_to_tasks(prompt, threshold=0.5)
+    
+    assert stale == []
+    assert [task_id for task_id, _ in mapper.map_prompt_to_tasks(prompt, threshold=0.5)] == ["infra_maint_001"]
+    mapper.close()
@@ -0,0 +1,52 @@
+import pytest
+from access_controller import MAPPING_TOP_K, AccessController
+from models import AccessRequest
+from prompt_analysis import PromptAnalyzer
+from prompt_segmenter import IntentSegmenter
+
+@pytest.fixture(scope="module")
+def segmenter():
+    return IntentSegmenter(PromptAnalyzer())
+
+@pytest.mark.parametrize("prompt", [
+    "I need read and write access to config.yaml",
+    "review the pull request and approve it",
+    "update docs and tests",
+    "hi",
+])
+def test_single_intent_stays_whole(segmenter, prompt):
+    assert segmenter.split(prompt) == [prompt]
+
+@pytest.mark.parametrize("prompt, clauses", [
+    ("fix the prod bug and then draft the client proposal",
+     ["fix the prod bug", "draft the client proposal"]),
+    ("Deploy the release to production. Also update the sales pipeline dashboard",
+     ["Deploy the release to production", "update the sales pipeline dashboard"]),
+    ("restart the payment service; afterwards notify the on-call engineer",
+     ["restart the payment service", "notify the on-call engineer"]),
+])
+def test_sequenced_intents_are_split(segmenter, prompt, clauses):
+    assert segmenter.split(prompt) == clauses
+
+def test_short_fragments_merge_into_neighbour(segmenter):
+    assert segmenter.split("deploy the release to production. ok") == ["deploy the release to production ok"]
+
+def test_segments_are_capped():
+    segmenter = IntentSegmenter(PromptAnalyzer(), max_segments=2)
+    segments = segmenter.split("build the api image. run the test suite. ship the release build")
+    
+    assert segments == ["build the api image", "run the test suite ship the release build"]
+
+def test_access_decisions_score_the_whole_prompt_by_default():
+    controller = AccessController()
+    prompt = "fix the prod bug and then draft the client proposal"
+    request = AccessRequest(user_id=next(iter(controller.users)), prompt=prompt, requested_tool_calls=[])
+    user = controller.users[request.user_id]
+    
+    response = controller.evaluate_access_request(request)
+    whole_prompt = controller.task_mapper.map_prompt_to_tasks(
+        prompt, persona=user.persona, global_fallback=True, top_k=MAPPING_TOP_K
+    )
+    
+    assert controller.multi_intent is False
+    assert response.mapped_tasks == [task_id for task_id, _ in whole_prompt]
@@ -0,0 +1,44 @@
+import fnmatch
+import pytest
+from data import TASKS
+from models import PersonaType
+from task_catalog import TaskCatalog
+
+@pytest.fixture(scope="module")
+def catalog():
+    return TaskCatalog(TASKS)
+
+def test_lookups_match_a_linear_scan(catalog):
+    assert catalog.tasks == tuple(TASKS)
+    for task in TASKS:
+        assert catalog.get(task.task_id) is task
+        assert task.task_id in catalog
+    for persona in PersonaType:
+        assert catalog.by_persona(persona) == tuple(task for task in TASKS if task.persona == persona)
+        assert catalog.task_ids_by_persona(persona) == tuple(
+            task.task_id for task in TASKS if task.persona == persona
+        )
+    assert catalog.get("unknown") is None
+
+def test_resource_lookups(catalog):
+    for task in TASKS:
+        for permission in task.required_permissions:
+            assert task in catalog.by_resource(permission.resource_type, permission.resource_path)
+            assert task in catalog.by_resource(permission.resource_type)
+    
+    path = "/engineering/service/main.py"
+    expected = tuple(
+        task for task in TASKS
+        if any(permission.resource_type == "filesystem" and fnmatch.fnmatch(path, permission.resource_path)
+               for permission in task.required_permissions)
+    )
+    assert catalog.for_path("filesystem", path) == expected
+    assert catalog.for_path("nonexistent", path) == ()
+
+def test_catalog_is_read_only(catalog):
+    with pytest.raises(TypeError):
+        catalog.by_id["new_task"] = TASKS[0]
+
+def test_duplicate_task_ids_are_rejected():
+    with pytest.raises(ValueError, match=TASKS[0].task_id):
+        TaskCatalog([TASKS[0], TASKS[0]])
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from data import EVALUATION_PROMPTS, SAMPLE_PROMPTS
+from task_mapper import TaskMapper
+
+PROMPTS = [p["text"] for p in SAMPLE_PROMPTS + EVALUATION_PROMPTS]
+
+@pytest.mark.parametrize("backend", ["tfidf", "hashing"])
+def test_artifact_scores_match_fresh_fit(tmp_path, backend):
+    fitted = TaskMapper(artifact_dir=str(tmp_path), backend=backend, fast_path_size=0)
+    loaded = TaskMapper(artifact_dir=str(tmp_path), backend=backend, fast_path_size=0)
+    
+    assert loaded.vectorizer.idf_.dtype == fitted.vectorizer.idf_.dtype == np.float32
+    assert loaded.map_prompts_to_tasks(PROMPTS, 0.0) == fitted.map_prompts_to_tasks(PROMPTS, 0.0)
+    fitted.close()
+    loaded.close()
+
+def test_partial_fit_keeps_dtype():
+    mapper = TaskMapper(artifact_dir=None, fast_path_size=0)
+    mapper.add_examples(["rotate the edge proxy certificates"], ["infra_maint_001"])
+    
+    assert mapper.vectorizer.idf_.dtype == np.float32
+    assert mapper.vectorizer.transform(PROMPTS[:3]).dtype == np.float32
+    mapper.close()
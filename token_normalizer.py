@@ -0,0 +1,76 @@
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+# "stem" folds inflections with the Porter stemmer; "lemma" maps tokens to WordNet lemmas
+NORMALIZERS = ("stem", "lemma")
+
+def _import_nltk():
+    """Import nltk only when token normalization is used"""
+    try:
+        import nltk
+    except ImportError as e:
+        raise ImportError("Token normalization requires nltk (pip install -r requirements.txt)") from e
+    return nltk
+
+def _lemmatizer() -> Callable[[str], str]:
+    """WordNet lemma of a token: its verb lemma, or its noun lemma if that is unchanged"""
+    from nltk.stem import WordNetLemmatizer
+    lemmatizer = WordNetLemmatizer()
+    try:
+        lemmatizer.lemmatize("deploying", pos="v")
+    except LookupError as e:
+        raise LookupError("Lemmatization needs the WordNet corpus (python -m nltk.downloader wordnet)") from e
+    
+    def lemmatize(token: str) -> str:
+        lemma = lemmatizer.lemmatize(token, pos="v")
+        return lemma if lemma != token else lemmatizer.lemmatize(token, pos="n")
+    return lemmatize
+
+class TokenNormalizer:
+    """
+    Stemming or lemmatization of tokens through a bounded per-token memo
+    
+    Prompt vocabularies are small and repetitive, so nearly every token has been
+    seen before: the NLTK call runs once per distinct token and later occurrences
+    are a dictionary lookup. The memo keeps the memo_size most recently used tokens.
+    """
+    
+    def __init__(self, method: str = "stem", memo_size: int = 65536):
+        """
+        Args:
+            method: One of NORMALIZERS
+            memo_size: Distinct tokens kept in the memo
+        """
+        if method not in NORMALIZERS:
+            raise ValueError(f"Unknown token normalizer: {method}")
+        _import_nltk()
+        if method == "stem":
+            from nltk.stem import PorterStemmer
+            normalize = PorterStemmer().stem
+        else:
+            normalize = _lemmatizer()
+        
+        self.method = method
+        self.memo_size = memo_size
+        self._normalize = lru_cache(maxsize=memo_size)(normalize)
+    
+    def __repr__(self) -> str:
+        # Stable across processes: the repr feeds the model fingerprint
+        return f"TokenNormalizer({self.method!r})"
+    
+    def __call__(self, tokens: List[str]) -> List[str]:
+        normalize = self._normalize
+        return [normalize(token) for token in tokens]
+    
+    def stats(self) -> Dict:
+        """Memo hit/miss counters"""
+        info = self._normalize.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "method": self.method,
+            "size": info.currsize,
+            "memo_size": self.memo_size,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,186 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.feature_selection import chi2
+from sklearn.preprocessing import normalize
+
+def smoothed_idf(doc_freq: np.ndarray, n_docs: int) -> np.ndarray:
+    """
+    Smoothed inverse document frequency, as in scikit-learn's TfidfTransformer
+    
+    Features that never occurred get zero weight, matching a vocabulary that lacks them.
+    """
+    doc_freq = np.asarray(doc_freq, dtype=np.float64)
+    return np.where(doc_freq > 0, np.log((1 + n_docs) / (1 + doc_freq)) + 1, 0.0)
+
+class IncrementalTfidfVectorizer(TfidfVectorizer):
+    """
+    TfidfVectorizer that tracks document frequencies
+    
+    New documents update the idf of known terms through partial_fit without
+    refitting; terms outside the fitted vocabulary are ignored until the next fit.
+    Output always has the configured dtype (scikit-learn stores idf as float64 and
+    would otherwise upcast prompts once idf is updated).
+    """
+    
+    def fit_transform(self, raw_documents, y=None):
+        tfidf = super().fit_transform(raw_documents, y).astype(self.dtype, copy=False)
+        # Every stored entry is a term present in a document (idf is always positive)
+        self.doc_freq = np.bincount(tfidf.indices, minlength=tfidf.shape[1]).astype(np.int32)
+        self.n_docs = tfidf.shape[0]
+        return tfidf
+    
+    def transform(self, raw_documents):
+        return super().transform(raw_documents).astype(self.dtype, copy=False)
+    
+    def select_features(self, raw_documents, tfidf: sp.csr_matrix, labels: List[str], k: int) -> sp.csr_matrix:
+        """
+        Refit on the k features most dependent on the labels
+        
+        Features are ranked by their chi-squared statistic against the labels on the
+        fitted TF-IDF matrix; the documents are then refitted with the selected
+        vocabulary held fixed, so idf and row norms only involve kept features.
+        
+        Args:
+            raw_documents: The documents the vectorizer was fitted on
+            tfidf: Their TF-IDF matrix from fit_transform
+            labels: Label of each document
+            k: Number of features to keep
+            
+        Returns:
+            TF-IDF matrix of the documents over the selected features
+        """
+        scores = np.nan_to_num(chi2(tfidf, labels)[0])
+        keep = np.sort(np.argsort(-scores, kind="stable")[:k])
+        self.set_params(vocabulary=list(self.get_feature_names_out()[keep]))
+        try:
+            return self.fit_transform(raw_documents)
+        finally:
+            # The selected vocabulary stays fitted; the parameters (and so the model
+            # fingerprint) keep describing how it is derived
+            self.set_params(vocabulary=None)
+    
+    def transform_counts(self, term_counts: List[Dict[str, int]]) -> sp.csr_matrix:
+        """TF-IDF vectors from precomputed feature counts; unknown features are ignored"""
+        rows, columns, values = [], [], []
+        for row, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                column = self.vocabulary_.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(count)
+        counts = sp.csr_matrix((values, (rows, columns)), shape=(len(term_counts), len(self.vocabulary_)))
+        weighted = sp.csr_matrix(counts.multiply(self.idf_))
+        return normalize(weighted, norm="l2", copy=False).astype(self.dtype, copy=False)
+    
+    def term_columns(self, terms: List[str]) -> np.ndarray:
+        """Feature column of each term (-1 for terms outside the vocabulary)"""
+        return np.array([self.vocabulary_.get(term, -1) for term in terms], dtype=np.intp)
+    
+    def partial_fit(self, raw_documents: Iterable) -> "IncrementalTfidfVectorizer":
+        """Add documents to the document frequencies of the fitted vocabulary"""
+        presence = self.transform(raw_documents)
+        self.doc_freq = self.doc_freq + np.bincount(presence.indices, minlength=len(self.doc_freq)).astype(np.int32)
+        self.n_docs += presence.shape[0]
+        self._set_idf(smoothed_idf(self.doc_freq, self.n_docs))
+        return self
+    
+    def restore(self, doc_freq: np.ndarray, n_docs: int, terms: Optional[List[str]] = None):
+        """Load a previously fitted vocabulary and its document frequencies"""
+        self.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        self.doc_freq = doc_freq
+        self.n_docs = n_docs
+        self._set_idf(smoothed_idf(doc_freq, n_docs))
+    
+    def _set_idf(self, idf: np.ndarray):
+        """Install idf weights in the configured dtype, as fit does"""
+        # The idf_ setter always stores a float64 diagonal, which would weight prompts
+        # at a different precision than a freshly fitted vectorizer
+        self.idf_ = idf
+        self._tfidf._idf_diag = self._tfidf._idf_diag.astype(self.dtype)
+
+class HashingTfidfVectorizer:
+    """
+    Stateless TF-IDF vectorizer built on feature hashing
+    
+    Terms are hashed into a fixed number of columns, so there is no vocabulary to
+    store: memory is one document-frequency array of n_features entries regardless
+    of how many distinct n-grams the corpus contains. Because the feature space is
+    fixed, new labeled documents only update document frequencies (partial_fit).
+    """
+    
+    def __init__(self, analyzer: Callable, n_features: int = 2 ** 18, dtype: type = np.float32):
+        """
+        Args:
+            analyzer: Callable turning a document into its list of features
+            n_features: Number of hashed feature columns
+            dtype: Floating point type of the output vectors
+        """
+        self.analyzer = analyzer
+        self.n_features = n_features
+        self.dtype = dtype
+        self.hasher = HashingVectorizer(
+            analyzer=analyzer, n_features=n_features, alternate_sign=False, norm=None, dtype=dtype
+        )
+        # Hashes feature names exactly like the HashingVectorizer, from {feature: count} dicts
+        self.count_hasher = FeatureHasher(
+            n_features=n_features, input_type="dict", alternate_sign=False, dtype=dtype
+        )
+        self.doc_freq = np.zeros(n_features, dtype=np.int32)
+        self.n_docs = 0
+        self.idf_ = np.ones(n_features, dtype=dtype)
+    
+    def get_params(self) -> Dict:
+        """Configuration that determines the fitted feature space"""
+        return {
+            "backend": "hashing", "analyzer": self.analyzer, "n_features": self.n_features,
+            "dtype": np.dtype(self.dtype).name
+        }
+    
+    def fit_transform(self, documents: Iterable) -> sp.csr_matrix:
+        """Fit document frequencies and return the TF-IDF matrix of the documents"""
+        self.doc_freq = np.zeros(self.n_features, dtype=np.int32)
+        self.n_docs = 0
+        counts = self.hasher.transform(documents)
+        self._update(counts)
+        return self._weight(counts)
+    
+    def partial_fit(self, documents: Iterable) -> "HashingTfidfVectorizer":
+        """Add documents to the document frequencies without refitting"""
+        self._update(self.hasher.transform(documents))
+        return self
+    
+    def transform(self, documents: Iterable) -> sp.csr_matrix:
+        """L2-normalized TF-IDF vectors of documents"""
+        return self._weight(self.hasher.transform(documents))
+    
+    def transform_counts(self, term_counts: List[Dict[str, int]]) -> sp.csr_matrix:
+        """L2-normalized TF-IDF vectors from precomputed feature counts"""
+        return self._weight(self.count_hasher.transform(term_counts))
+    
+    def term_columns(self, terms: List[str]) -> np.ndarray:
+        """Hashed feature column of each term"""
+        # One single-term row per term; each has exactly one stored entry
+        return self.count_hasher.transform([{term: 1} for term in terms]).indices.astype(np.intp)
+    
+    def restore(self, doc_freq: np.ndarray, n_docs: int, terms: Optional[List[str]] = None):
+        """Load previously computed document frequencies (there is no vocabulary to restore)"""
+        self.doc_freq = doc_freq
+        self.n_docs = n_docs
+        self.idf_ = smoothed_idf(doc_freq, n_docs).astype(self.dtype)
+    
+    def _update(self, counts: sp.csr_matrix):
+        """Accumulate document frequencies of a batch of term-count rows"""
+        counts = counts.tocsr()
+        counts.sum_duplicates()
+        self.doc_freq = self.doc_freq + np.bincount(counts.indices, minlength=self.n_features).astype(np.int32)
+        self.n_docs += counts.shape[0]
+        self.idf_ = smoothed_idf(self.doc_freq, self.n_docs).astype(self.dtype)
+    
+    def _weight(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        """Apply idf weights and L2-normalize term-count rows"""
+        weighted = sp.csr_matrix(counts.multiply(self.idf_))
+        return normalize(weighted, norm="l2", copy=False)